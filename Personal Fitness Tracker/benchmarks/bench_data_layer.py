@@ -0,0 +1,152 @@
+"""Latency / throughput / memory benchmark for the data and auth layers.
+
+    python benchmarks/bench_data_layer.py --rows 100k --storage csv --output results.json
+
+Data is generated into a scratch directory with a fixed seed, so runs with the
+same arguments are comparable across commits and storage engines.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_data import PRESETS, generate, user_email, user_password
+from utils.auth import AuthManager
+from utils.data_manager import DataManager
+from utils.frame_cache import frame_cache
+from utils.storage import CsvStorage, SQLiteStorage, migrate_csv_to_sqlite
+
+SAMPLE_METRICS = {
+    'age': 35, 'gender': 'Female', 'weight': 68.5, 'height': 168,
+    'activity_level': 'Moderate', 'sleep_hours': 7.5, 'stress_level': 4,
+    'heart_rate': 62, 'exercise_minutes': 45
+}
+
+
+def make_storage(kind, data_dir):
+    if kind == "sqlite":
+        db_path = os.path.join(data_dir, "fitness.db")
+        if not os.path.exists(db_path):
+            migrate_csv_to_sqlite(data_dir, db_path)
+        return SQLiteStorage(db_path)
+    if kind == "parquet":
+        from utils.columnar import ParquetStorage, convert_csv
+        if not os.path.exists(os.path.join(data_dir, "fitness_parquet")):
+            convert_csv(data_dir)
+        return ParquetStorage(data_dir)
+    return CsvStorage(data_dir)
+
+
+def percentile(sorted_values, pct):
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(operation, iterations, before_each=None, warmup=False):
+    if warmup:
+        for i in range(iterations + 1):
+            operation(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        if before_each is not None:
+            before_each()
+        t0 = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    # Peak memory is taken from one extra traced call so tracing doesn't skew latencies
+    if before_each is not None:
+        before_each()
+    tracemalloc.start()
+    operation(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.fmean(ms),
+        'p50_ms': percentile(ms, 50),
+        'p90_ms': percentile(ms, 90),
+        'p99_ms': percentile(ms, 99),
+        'max_ms': ms[-1],
+        'throughput_per_s': iterations / total if total else None,
+        'peak_memory_bytes': peak
+    }
+
+
+def run(args):
+    rows = PRESETS.get(args.rows.lower()) or int(args.rows)
+    data_dir = tempfile.mkdtemp(prefix="fitness-bench-")
+    try:
+        info = generate(data_dir, rows, args.seed)
+        users = info['users']
+        storage = make_storage(args.storage, data_dir)
+        data_manager = DataManager(storage)
+        auth_manager = AuthManager(storage)
+        n = args.iterations
+
+        def user(i):
+            return user_email((i * 7919) % users)
+
+        results = {
+            # cold: every call starts from an empty in-process cache
+            'get_user_metrics_cold': measure(lambda i: data_manager.get_user_metrics(user(i)), n,
+                                             before_each=frame_cache.clear),
+            'get_user_metrics_warm': measure(lambda i: data_manager.get_user_metrics(user(i)), n,
+                                             warmup=True),
+            'get_latest_metrics': measure(lambda i: data_manager.get_latest_metrics(user(i)), n),
+            'login_user': measure(
+                lambda i: auth_manager.login_user(user(i), user_password((i * 7919) % users)), n
+            ),
+            'save_metrics': measure(lambda i: data_manager.save_metrics(user(i), dict(SAMPLE_METRICS)), n),
+            'save_feedback': measure(lambda i: data_manager.save_feedback(user(i), "Benchmark feedback"), n),
+            'register_user': measure(
+                lambda i: auth_manager.register_user(f"new{i}@bench.test", "password", "New User"), n
+            ),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'storage': args.storage,
+            'rows': info['rows'],
+            'users': info['users'],
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1k", help="Row count or one of: " + ", ".join(PRESETS))
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
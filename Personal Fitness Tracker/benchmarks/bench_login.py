@@ -0,0 +1,115 @@
+"""Concurrent login throughput / latency benchmark for password hashing costs.
+
+    python benchmarks/bench_login.py --costs 4096,16384,32768 --threads 16 --workers 2
+
+For each cost every benchmark user first logs in once (upgrading the seeded
+legacy SHA-256 hashes to that cost), then a timed burst of concurrent logins
+reports latency percentiles, throughput and how many were turned away busy.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_data_layer import make_storage, percentile
+from benchmarks.generate_data import ROWS_PER_USER, generate, user_email, user_password
+from utils.auth import BUSY_MESSAGE, AuthManager
+from utils.passwords import DEFAULT_COSTS, PasswordHasher
+
+
+def login_burst(auth_manager, users, logins, threads):
+    def login(i):
+        user_id = (i * 7919) % users
+        start = time.perf_counter()
+        success, message = auth_manager.login_user(user_email(user_id), user_password(user_id))
+        return time.perf_counter() - start, success, message
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(login, range(logins)))
+    total = time.perf_counter() - start
+
+    busy = sum(1 for _, _, message in results if message == BUSY_MESSAGE)
+    failed = sum(1 for _, success, message in results if not success and message != BUSY_MESSAGE)
+    ms = sorted(latency * 1000 for latency, success, _ in results if success)
+    if not ms:
+        return {'logins': logins, 'busy': busy, 'failed': failed}
+    return {
+        'logins': logins,
+        'busy': busy,
+        'failed': failed,
+        'mean_ms': statistics.fmean(ms),
+        'p50_ms': percentile(ms, 50),
+        'p90_ms': percentile(ms, 90),
+        'p99_ms': percentile(ms, 99),
+        'max_ms': ms[-1],
+        'throughput_per_s': len(ms) / total if total else None
+    }
+
+
+def run(args):
+    costs = [int(cost) for cost in args.costs.split(",")] if args.costs else [DEFAULT_COSTS[args.algorithm]]
+    data_dir = tempfile.mkdtemp(prefix="fitness-login-")
+    results = {}
+    try:
+        info = generate(data_dir, args.users * ROWS_PER_USER, args.seed)
+        users = info['users']
+        storage = make_storage(args.storage, data_dir)
+        for cost in costs:
+            hasher = PasswordHasher(args.algorithm, cost, workers=args.workers,
+                                    queue=args.queue, timeout=args.timeout)
+            auth_manager = AuthManager(storage, hasher)
+            upgrade = login_burst(auth_manager, users, users, args.threads)
+            steady = login_burst(auth_manager, users, args.logins, args.threads)
+            results[str(cost)] = {'upgrade': upgrade, 'steady': steady}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'storage': args.storage,
+            'algorithm': args.algorithm,
+            'users': users,
+            'threads': args.threads,
+            'workers': args.workers,
+            'queue': args.queue,
+            'logins': args.logins,
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--algorithm", choices=sorted(DEFAULT_COSTS), default="scrypt")
+    parser.add_argument("--costs", help="Comma-separated costs (scrypt N or PBKDF2 iterations)")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=200, help="Logins in the timed burst")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent sessions logging in")
+    parser.add_argument("--workers", type=int, default=2, help="Hashing pool size")
+    parser.add_argument("--queue", type=int, default=32, help="Logins allowed to wait for the pool")
+    parser.add_argument("--timeout", type=float, default=10, help="Seconds a login waits for a slot")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
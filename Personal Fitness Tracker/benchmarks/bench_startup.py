@@ -0,0 +1,131 @@
+"""Cold-start and per-rerun benchmark for the Streamlit app.
+
+    python benchmarks/bench_startup.py --repeat 5 --output startup.json
+
+Each sample runs in a fresh interpreter, so the first script run includes every
+import a new server worker pays for. The app runs headless through
+streamlit.testing against a small generated data set.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from benchmarks.generate_data import generate, user_email
+
+# Modules whose import cost is reported separately
+IMPORT_TARGETS = {
+    'streamlit': "streamlit",
+    'login_path': "utils.session",
+    'dashboard': "pages.dashboard",
+    'profile': "pages.profile",
+    'plotly': "plotly.graph_objects",
+}
+
+APP_RUN = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_import = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+
+def timed_run():
+    start = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception
+    return (time.perf_counter() - start) * 1000
+
+result = {'testing_import_ms': (t_import - t0) * 1000}
+result['login_cold_ms'] = timed_run()
+result['login_loaded_dashboard'] = 'pages.dashboard' in sys.modules
+result['login_rerun_ms'] = [timed_run() for _ in range(int(sys.argv[3]))]
+at.session_state['user_email'] = sys.argv[2]
+at.session_state['user_name'] = 'Bench User'
+result['dashboard_first_ms'] = timed_run()
+result['dashboard_rerun_ms'] = [timed_run() for _ in range(int(sys.argv[3]))]
+print(json.dumps(result))
+"""
+
+
+def _median(values):
+    return statistics.median(values) if values else None
+
+
+def import_time(module, cwd):
+    # -X importtime reports cumulative microseconds per module on stderr
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env={**os.environ, 'PYTHONPATH': APP_DIR},
+                          capture_output=True, text=True, check=True)
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+
+def app_run(work_dir, email, reruns):
+    proc = subprocess.run([sys.executable, "-c", APP_RUN, os.path.join(APP_DIR, "main.py"), email, str(reruns)],
+                          cwd=work_dir, env={**os.environ, 'PYTHONPATH': APP_DIR},
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="fitness-startup-")
+    try:
+        info = generate(os.path.join(work_dir, "data"), args.rows, args.seed)
+        shutil.copytree(os.path.join(APP_DIR, "styles"), os.path.join(work_dir, "styles"))
+
+        imports = {name: [] for name in IMPORT_TARGETS}
+        runs = []
+        for _ in range(args.repeat):
+            for name, module in IMPORT_TARGETS.items():
+                imports[name].append(import_time(module, work_dir))
+            runs.append(app_run(work_dir, user_email(0), args.reruns))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'rows': info['rows'],
+            'repeat': args.repeat,
+            'reruns': args.reruns,
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': {
+            'import_ms': {name: _median(values) for name, values in imports.items()},
+            'login_cold_ms': _median([r['login_cold_ms'] for r in runs]),
+            'login_rerun_ms': _median([ms for r in runs for ms in r['login_rerun_ms']]),
+            'login_loads_dashboard': any(r['login_loaded_dashboard'] for r in runs),
+            'dashboard_first_ms': _median([r['dashboard_first_ms'] for r in runs]),
+            'dashboard_rerun_ms': _median([ms for r in runs for ms in r['dashboard_rerun_ms']]),
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm reruns per page and interpreter")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
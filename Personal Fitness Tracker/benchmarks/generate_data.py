@@ -0,0 +1,103 @@
+"""Seeded generator for realistic fitness_data.csv / users.csv files.
+
+    python benchmarks/generate_data.py --rows 100000 --out /tmp/fitness-100k
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.storage import FEEDBACK_COLUMNS, FITNESS_COLUMNS, USER_COLUMNS, CsvStorage
+from utils.data_manager import CALORIES_PER_MINUTE, DataManager
+
+PRESETS = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+ROWS_PER_USER = 100
+CHUNK_ROWS = 200_000
+GENDERS = np.array(["Male", "Female", "Other"])
+ACTIVITY_LEVELS = np.array(list(CALORIES_PER_MINUTE))
+
+
+def user_email(user_id):
+    return f"user{user_id}@bench.test"
+
+
+def user_password(user_id):
+    return f"password{user_id}"
+
+
+def _users_profile(rng, users):
+    return {
+        'age': rng.integers(18, 80, users).astype(float),
+        'gender': GENDERS[rng.integers(0, len(GENDERS), users)],
+        'height': np.round(rng.normal(170, 10, users).clip(140, 210), 1),
+        'weight': np.round(rng.normal(75, 15, users).clip(40, 180), 1),
+        'activity_level': ACTIVITY_LEVELS[rng.integers(0, len(ACTIVITY_LEVELS), users)]
+    }
+
+
+def generate(out_dir, rows, seed=42):
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    users = max(rows // ROWS_PER_USER, 1)
+    profile = _users_profile(rng, users)
+    start_date = np.datetime64('2015-01-01')
+
+    with open(os.path.join(out_dir, "users.csv"), 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(USER_COLUMNS)
+        for user_id in range(users):
+            writer.writerow([user_email(user_id),
+                             hashlib.sha256(user_password(user_id).encode()).hexdigest(),
+                             f"Bench User {user_id}"])
+
+    with open(os.path.join(out_dir, "feedback.csv"), 'w', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerow(FEEDBACK_COLUMNS)
+
+    fitness_path = os.path.join(out_dir, "fitness_data.csv")
+    with open(fitness_path, 'w', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerow(FITNESS_COLUMNS)
+    data_manager = DataManager(CsvStorage(out_dir))
+    for offset in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - offset)
+        row_ids = np.arange(offset, offset + n)
+        # Users log round-robin, one entry per day each
+        user_ids = row_ids % users
+        days = row_ids // users
+        weight = np.round(profile['weight'][user_ids] + rng.normal(0, 1.5, n), 1)
+        exercise = rng.integers(0, 120, n).astype(float)
+        chunk = pd.DataFrame({
+            'email': [user_email(u) for u in user_ids],
+            'date': (start_date + days).astype(str),
+            'age': profile['age'][user_ids],
+            'gender': profile['gender'][user_ids],
+            'weight': weight,
+            'height': profile['height'][user_ids],
+            'activity_level': profile['activity_level'][user_ids],
+            'sleep_hours': np.round(rng.normal(7, 1.2, n).clip(3, 12) * 2) / 2,
+            'stress_level': rng.integers(1, 11, n).astype(float),
+            'heart_rate': rng.integers(50, 100, n).astype(float),
+            'exercise_minutes': exercise
+        })
+        chunk['calories_burned'] = data_manager.calculate_calories_burned_vectorized(
+            chunk['weight'], chunk['exercise_minutes'], chunk['activity_level']
+        )
+        chunk[FITNESS_COLUMNS].to_csv(fitness_path, mode='a', header=False, index=False, lineterminator='\n')
+    return {'rows': rows, 'users': users, 'seed': seed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="1k", help="Row count or one of: " + ", ".join(PRESETS))
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = PRESETS.get(args.rows.lower()) or int(args.rows)
+    info = generate(args.out, rows, args.seed)
+    print(f"Wrote {info['rows']} rows for {info['users']} users to {args.out}")
@@ -1,8 +1,6 @@
 import streamlit as st
-import extra_streamlit_components as stx
-from utils.auth import AuthManager
-from pages.dashboard import show_dashboard
-from pages.profile import show_profile
+from utils.session import get_auth_manager
+from utils.profiling import profile_rerun, span, start_metrics_server
 
 # Configure the app
 st.set_page_config(
@@ -17,12 +15,16 @@ if 'user_email' not in st.session_state:
 if 'user_name' not in st.session_state:
     st.session_state.user_name = None
 
-# Load custom CSS
-with open('styles/main.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+# Load custom CSS (read from disk once per process, not on every rerun)
+@st.cache_resource
+def load_css(path):
+    with open(path) as f:
+        return f.read()
+
+st.markdown(f'<style>{load_css("styles/main.css")}</style>', unsafe_allow_html=True)
 
 def main():
-    auth_manager = AuthManager()
+    auth_manager = get_auth_manager()
 
     # Side navigation
     with st.sidebar:
@@ -74,14 +76,23 @@ def main():
                             st.error(message)
 
     else:
-        # Navigation tabs for authenticated users
-        tab1, tab2 = st.tabs(["Dashboard", "Profile"])
+        # Navigation for authenticated users; unlike st.tabs, only the
+        # selected page runs, so the hidden one does no data loading
+        page = st.radio("Navigation", ["Dashboard", "Profile"], horizontal=True,
+                        label_visibility="collapsed", key="page")
 
-        with tab1:
+        # Pages (and plotly) are imported on first authenticated use, so the
+        # login view and fresh workers don't pay for the plotting stack
+        if page == "Dashboard":
+            from pages.dashboard import show_dashboard
             show_dashboard()
-
-        with tab2:
+        else:
+            from pages.profile import show_profile
             show_profile()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # FITNESS_TRACE=1 enables spans (FITNESS_METRICS_PORT serves /metrics);
+    # FITNESS_PROFILE=cprofile|pyinstrument captures a profile per rerun
+    start_metrics_server()
+    with profile_rerun(), span("main"):
+        main()
\ No newline at end of file
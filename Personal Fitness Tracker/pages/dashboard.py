@@ -1,17 +1,57 @@
 import streamlit as st
 import plotly.graph_objects as go
-from utils.data_manager import DataManager
-
+from utils.data_manager import AGGREGATION_BUCKETS, DEFAULT_HISTORY_WINDOW, HISTORY_WINDOWS
+from utils.figure_cache import figure_cache, user_data_version
+from utils.profiling import span, traced
+from utils.session import get_data_manager, get_session_metrics
+
+# Approximate rendered widths, used to bound the number of points per chart
+FULL_CHART_WIDTH = 1200
+HALF_CHART_WIDTH = 600
+
+def _line_figure(data, metric, name, color, title, height):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=data['date'],
+        y=data[metric],
+        mode='lines+markers',
+        name=name,
+        line=dict(color=color, width=3),
+        marker=dict(size=8)
+    ))
+    fig.update_layout(
+        title=title,
+        template='plotly_dark',
+        height=height
+    )
+    return fig
+
+def _bar_figure(data, metric, name, color, title, height):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=data['date'],
+        y=data[metric],
+        name=name,
+        marker_color=color
+    ))
+    fig.update_layout(
+        title=title,
+        template='plotly_dark',
+        height=height
+    )
+    return fig
+
+@traced("show_dashboard")
 def show_dashboard():
     if 'user_email' not in st.session_state:
         st.warning("Please login to access the dashboard")
         return
 
     st.title("🏃‍♂️ Fitness Dashboard")
-    data_manager = DataManager()
-    user_metrics = data_manager.get_user_metrics(st.session_state.user_email)
+    data_manager = get_data_manager()
+    summary = data_manager.get_summary(st.session_state.user_email)
 
-    if user_metrics.empty:
+    if summary['entries'] == 0:
         st.info("No data available. Please add your metrics in the Profile section.")
         return
 
@@ -19,7 +59,7 @@ def show_dashboard():
     custom_colors = ['#FF4B4B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692']
 
     # First row - Summary Cards
-    latest_metrics = data_manager.get_latest_metrics(st.session_state.user_email)
+    latest_metrics = summary['latest']
 
     if latest_metrics is not None:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
@@ -28,8 +68,8 @@ def show_dashboard():
         # Fix: Initialize delta before using it
         delta = "N/A"
 
-        if len(user_metrics) >= 2:
-            previous_weight = user_metrics['weight'].iloc[-2]
+        if summary['previous_weight'] is not None:
+            previous_weight = summary['previous_weight']
             delta = f"{latest_metrics['weight'] - previous_weight:.1f} kg"
 
         with col1:
@@ -47,6 +87,32 @@ def show_dashboard():
 
     # Progress Charts
     st.subheader("📊 Fitness Progress")
+    range_col, bucket_col = st.columns(2)
+    with range_col:
+        window = st.selectbox("Range", list(HISTORY_WINDOWS), key="chart_range",
+                              index=list(HISTORY_WINDOWS).index(DEFAULT_HISTORY_WINDOW))
+    with bucket_col:
+        bucket = st.selectbox("Aggregation", ["Auto"] + list(AGGREGATION_BUCKETS), key="chart_bucket")
+    # Only the selected range is loaded, aggregated and plotted
+    user_metrics = get_session_metrics(data_manager, st.session_state.user_email, HISTORY_WINDOWS[window])
+    user_metrics['bmi'] = data_manager.calculate_bmi_vectorized(
+        user_metrics['weight'], user_metrics['height']
+    )
+
+    email = st.session_state.user_email
+    version = user_data_version(summary)
+
+    def chart(metric, width_px, make_figure, *args):
+        # Unchanged charts are served from the cache; aggregation and figure
+        # construction only run when this user's data, the range or the bucket changes
+        key = (email, metric, version, window, bucket)
+
+        def build():
+            with span("chart.build", metric=metric, bucket=bucket):
+                return make_figure(
+                    data_manager.prepare_chart_series(user_metrics, metric, bucket, width_px), metric, *args
+                )
+        return figure_cache.get_or_build(key, build)
 
     # Weight and BMI Trends
     with st.container():
@@ -54,41 +120,13 @@ def show_dashboard():
         tab1, tab2 = st.tabs(["Weight Progress", "BMI Trend"])
 
         with tab1:
-            fig_weight = go.Figure()
-            fig_weight.add_trace(go.Scatter(
-                x=user_metrics['date'],
-                y=user_metrics['weight'],
-                mode='lines+markers',
-                name='Weight',
-                line=dict(color=custom_colors[0], width=3),
-                marker=dict(size=8)
-            ))
-            fig_weight.update_layout(
-                title='Weight Progress Over Time',
-                template='plotly_dark',
-                height=400
-            )
+            fig_weight = chart('weight', FULL_CHART_WIDTH, _line_figure,
+                               'Weight', custom_colors[0], 'Weight Progress Over Time', 400)
             st.plotly_chart(fig_weight, use_container_width=True)
 
         with tab2:
-            user_metrics['bmi'] = user_metrics.apply(
-                lambda row: data_manager.calculate_bmi(row['weight'], row['height']),
-                axis=1
-            )
-            fig_bmi = go.Figure()
-            fig_bmi.add_trace(go.Scatter(
-                x=user_metrics['date'],
-                y=user_metrics['bmi'],
-                mode='lines+markers',
-                name='BMI',
-                line=dict(color=custom_colors[1], width=3),
-                marker=dict(size=8)
-            ))
-            fig_bmi.update_layout(
-                title='BMI Trend Over Time',
-                template='plotly_dark',
-                height=400
-            )
+            fig_bmi = chart('bmi', FULL_CHART_WIDTH, _line_figure,
+                            'BMI', custom_colors[1], 'BMI Trend Over Time', 400)
             st.plotly_chart(fig_bmi, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -98,35 +136,15 @@ def show_dashboard():
 
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_exercise = go.Figure()
-        fig_exercise.add_trace(go.Bar(
-            x=user_metrics['date'],
-            y=user_metrics['exercise_minutes'],
-            name='Exercise Duration',
-            marker_color=custom_colors[2]
-        ))
-        fig_exercise.update_layout(
-            title='Daily Exercise Minutes',
-            template='plotly_dark',
-            height=300
-        )
+        fig_exercise = chart('exercise_minutes', HALF_CHART_WIDTH, _bar_figure,
+                             'Exercise Duration', custom_colors[2], 'Exercise Minutes', 300)
         st.plotly_chart(fig_exercise, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_calories = go.Figure()
-        fig_calories.add_trace(go.Bar(
-            x=user_metrics['date'],
-            y=user_metrics['calories_burned'],
-            name='Calories Burned',
-            marker_color=custom_colors[3]
-        ))
-        fig_calories.update_layout(
-            title='Daily Calories Burned',
-            template='plotly_dark',
-            height=300
-        )
+        fig_calories = chart('calories_burned', HALF_CHART_WIDTH, _bar_figure,
+                             'Calories Burned', custom_colors[3], 'Calories Burned', 300)
         st.plotly_chart(fig_calories, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -136,38 +154,14 @@ def show_dashboard():
 
     with col3:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_sleep = go.Figure()
-        fig_sleep.add_trace(go.Scatter(
-            x=user_metrics['date'],
-            y=user_metrics['sleep_hours'],
-            mode='lines+markers',
-            name='Sleep Hours',
-            line=dict(color=custom_colors[4], width=3),
-            marker=dict(size=8)
-        ))
-        fig_sleep.update_layout(
-            title='Sleep Pattern',
-            template='plotly_dark',
-            height=300
-        )
+        fig_sleep = chart('sleep_hours', HALF_CHART_WIDTH, _line_figure,
+                          'Sleep Hours', custom_colors[4], 'Sleep Pattern', 300)
         st.plotly_chart(fig_sleep, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col4:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_stress = go.Figure()
-        fig_stress.add_trace(go.Scatter(
-            x=user_metrics['date'],
-            y=user_metrics['stress_level'],
-            mode='lines+markers',
-            name='Stress Level',
-            line=dict(color=custom_colors[5], width=3),
-            marker=dict(size=8)
-        ))
-        fig_stress.update_layout(
-            title='Stress Level Trend',
-            template='plotly_dark',
-            height=300
-        )
+        fig_stress = chart('stress_level', HALF_CHART_WIDTH, _line_figure,
+                           'Stress Level', custom_colors[5], 'Stress Level Trend', 300)
         st.plotly_chart(fig_stress, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -1,13 +1,16 @@
 import streamlit as st
-from utils.data_manager import DataManager
+from utils.data_manager import DEFAULT_HISTORY_WINDOW, HISTORY_WINDOWS
+from utils.profiling import traced
+from utils.session import get_data_manager, get_session_metrics
 
+@traced("show_profile")
 def show_profile():
     if 'user_email' not in st.session_state:
         st.warning("Please login to access the profile")
         return
 
     st.title("Profile & Metrics")
-    data_manager = DataManager()
+    data_manager = get_data_manager()
 
     # Create tabs for different sections
     metrics_tab, history_tab, feedback_tab = st.tabs([
@@ -55,10 +58,35 @@ def show_profile():
 
     with history_tab:
         st.subheader("Your Fitness History")
-        user_metrics = data_manager.get_user_metrics(st.session_state.user_email)
+        window = st.selectbox("Range", list(HISTORY_WINDOWS), key="history_range",
+                              index=list(HISTORY_WINDOWS).index(DEFAULT_HISTORY_WINDOW))
+        days = HISTORY_WINDOWS[window]
+        user_metrics = get_session_metrics(data_manager, st.session_state.user_email, days)
         if not user_metrics.empty:
             st.line_chart(user_metrics.set_index('date')[['weight', 'sleep_hours', 'stress_level']])
-            st.dataframe(user_metrics)
+
+            # Newest entries of the selected range first, one page at a time;
+            # the stack holds the cursor of every page visited so "Newer" can step back
+            cursors = st.session_state.setdefault(
+                f"history_cursors_{st.session_state.user_email}_{window}", [None])
+            page, next_cursor = data_manager.get_user_metrics_page(
+                st.session_state.user_email, cursors[-1],
+                start=data_manager.recent_start(st.session_state.user_email, days))
+            page['bmi'] = data_manager.calculate_bmi_vectorized(page['weight'], page['height'])
+            page['bmi_category'], _ = data_manager.get_bmi_category_vectorized(page['bmi'])
+            st.dataframe(page, hide_index=True)
+
+            newer_col, page_col, older_col = st.columns([1, 2, 1])
+            with newer_col:
+                if st.button("← Newer", disabled=len(cursors) == 1, key="history_newer"):
+                    cursors.pop()
+                    st.rerun()
+            with page_col:
+                st.caption(f"Page {len(cursors)}")
+            with older_col:
+                if st.button("Older →", disabled=next_cursor is None, key="history_older"):
+                    cursors.append(next_cursor)
+                    st.rerun()
         else:
             st.info("No historical data available yet.")
 
@@ -70,8 +98,10 @@ def show_profile():
             st.success("Thank you for your feedback!")
 
     # Display current metrics and recommendations
-    latest_metrics = data_manager.get_latest_metrics(st.session_state.user_email)
+    summary = data_manager.get_summary(st.session_state.user_email)
+    latest_metrics = summary['latest']
     if latest_metrics is not None:
+        plan = data_manager.get_recommendation(st.session_state.user_email, summary)
         st.subheader("Current Stats & Recommendations")
 
         # Create three columns for different metrics
@@ -83,25 +113,18 @@ def show_profile():
             st.metric("Height", f"{latest_metrics['height']} cm")
 
         with col2:
-            bmi = data_manager.calculate_bmi(latest_metrics['weight'], latest_metrics['height'])
-            bmi_category, bmi_suggestion = data_manager.get_bmi_category(bmi)
-            st.metric("BMI", f"{bmi:.1f}")
-            st.metric("BMI Category", bmi_category)
+            st.metric("BMI", f"{plan['bmi']:.1f}")
+            st.metric("BMI Category", plan['bmi_category'])
 
         with col3:
             st.metric("Activity Level", latest_metrics['activity_level'])
             st.metric("Daily Exercise", f"{latest_metrics['exercise_minutes']} minutes")
             st.metric("Calories Burned", f"{latest_metrics['calories_burned']:.0f} kcal")
+            st.metric("Logging Streak", f"{summary['current_streak']} days")
 
         # Exercise recommendations
         st.subheader("Personalized Recommendations")
-        exercise_plan = data_manager.get_exercise_suggestions(
-            latest_metrics['age'], 
-            bmi_category,
-            latest_metrics['activity_level']
-        )
-
-        st.write("🏃‍♂️ Recommended Exercises:", ", ".join(exercise_plan['exercises']))
-        st.write("⏱️ Suggested Duration:", exercise_plan['duration'])
-        st.write("📅 Recommended Frequency:", exercise_plan['frequency'])
-        st.write("💡 Health Tip:", bmi_suggestion)
\ No newline at end of file
+        st.write("🏃‍♂️ Recommended Exercises:", ", ".join(plan['exercises']))
+        st.write("⏱️ Suggested Duration:", plan['duration'])
+        st.write("📅 Recommended Frequency:", plan['frequency'])
+        st.write("💡 Health Tip:", plan['health_tip'])
\ No newline at end of file
@@ -1,42 +1,52 @@
-import streamlit as st
-import pandas as pd
-import hashlib
-import os
-from pathlib import Path
+from utils.passwords import HasherBusy, get_hasher
+from utils.profiling import trace_methods
+from utils.storage import get_storage
 
-class AuthManager:
-    def __init__(self):
-        self.users_file = "data/users.csv"
-        self._init_users_file()
+BUSY_MESSAGE = "Too many sign-ins right now, please try again in a moment"
 
-    def _init_users_file(self):
-        if not os.path.exists("data"):
-            os.makedirs("data")
-        if not os.path.exists(self.users_file):
-            pd.DataFrame(columns=['email', 'password', 'name']).to_csv(self.users_file, index=False)
+@trace_methods
+class AuthManager:
+    def __init__(self, storage=None, hasher=None):
+        self.storage = storage or get_storage()
+        self.hasher = hasher or get_hasher()
 
     def _hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        # Salted KDF computed on the shared hashing pool (utils.passwords)
+        return self.hasher.hash(password)
 
     def register_user(self, email, password, name):
-        users_df = pd.read_csv(self.users_file)
-        if email in users_df['email'].values:
+        if self.storage.get_user(email) is not None:
             return False, "Email already registered"
         
-        hashed_password = self._hash_password(password)
-        new_user = pd.DataFrame([[email, hashed_password, name]], 
-                               columns=['email', 'password', 'name'])
-        users_df = pd.concat([users_df, new_user], ignore_index=True)
-        users_df.to_csv(self.users_file, index=False)
+        try:
+            hashed_password = self._hash_password(password)
+        except HasherBusy:
+            return False, BUSY_MESSAGE
+        added = self.storage.add_user({
+            'email': email,
+            'password': hashed_password,
+            'name': name
+        })
+        if not added:
+            return False, "Email already registered"
         return True, "Registration successful"
 
     def login_user(self, email, password):
-        users_df = pd.read_csv(self.users_file)
-        user = users_df[users_df['email'] == email]
-        if user.empty:
+        user = self.storage.get_user(email)
+        if user is None:
             return False, "Email not found"
         
-        hashed_password = self._hash_password(password)
-        if user['password'].iloc[0] == hashed_password:
-            return True, user['name'].iloc[0]
-        return False, "Incorrect password"
\ No newline at end of file
+        try:
+            matches, needs_rehash = self.hasher.verify(password, user['password'])
+        except HasherBusy:
+            return False, BUSY_MESSAGE
+        if not matches:
+            return False, "Incorrect password"
+        if needs_rehash:
+            # Legacy SHA-256 (or outdated cost) hashes are upgraded on login;
+            # when the pool is busy the upgrade waits for the next login
+            try:
+                self.storage.update_password(email, self._hash_password(password), user['password'])
+            except HasherBusy:
+                pass
+        return True, user['name']
\ No newline at end of file
@@ -0,0 +1,157 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from utils.data_manager import DataManager
+from utils.frame_cache import frame_cache
+from utils.storage import FITNESS_COLUMNS, NUMERIC_COLUMNS
+
+BATCH_SIZE = 50_000
+# Every row needs what the profile form always saves and the pages display
+REQUIRED_COLUMNS = ['email', 'date', 'age', 'weight', 'height', 'activity_level']
+TEXT_COLUMNS = ['email', 'gender', 'activity_level']
+# save_metrics assumes 30 minutes when exercise is missing
+DEFAULT_EXERCISE_MINUTES = 30
+
+
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "jsonl" if str(path).endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _read_chunks(source, fmt, batch_size):
+    if fmt == "jsonl":
+        return pd.read_json(source, lines=True, chunksize=batch_size, dtype=False)
+    return pd.read_csv(source, chunksize=batch_size, skipinitialspace=True)
+
+
+def _prepare_batch(data_manager, chunk, column_map):
+    chunk = chunk.rename(columns=column_map or {})
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+
+    chunk = chunk.reindex(columns=FITNESS_COLUMNS)
+    for col in TEXT_COLUMNS:
+        chunk[col] = chunk[col].astype('string').str.strip().replace('', pd.NA)
+    chunk['date'] = pd.to_datetime(chunk['date'], errors='coerce', format='mixed').dt.strftime('%Y-%m-%d')
+    # Same coercion as save_metrics, but invalid values are rejected instead of raising
+    for col in NUMERIC_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+
+    valid = chunk[REQUIRED_COLUMNS].notna().all(axis=1)
+    chunk = chunk[valid].copy()
+
+    missing_calories = chunk['calories_burned'].isna()
+    if missing_calories.any():
+        chunk.loc[missing_calories, 'calories_burned'] = data_manager.calculate_calories_burned_vectorized(
+            chunk.loc[missing_calories, 'weight'],
+            chunk.loc[missing_calories, 'exercise_minutes'].fillna(DEFAULT_EXERCISE_MINUTES),
+            chunk.loc[missing_calories, 'activity_level'].astype(object)
+        )
+    return chunk, int((~valid).sum())
+
+
+def import_metrics(data_manager, source, fmt=None, batch_size=BATCH_SIZE, column_map=None):
+    storage = data_manager.storage
+    stats = {'read': 0, 'imported': 0, 'duplicates': 0, 'rejected': 0, 'batches': 0}
+    touched = set()
+    # (email, date) keys already stored, looked up once per email and then
+    # kept current as batches land, so each batch doesn't rescan the table
+    known_keys = set()
+    looked_up = set()
+
+    for chunk in _read_chunks(source, _detect_format(source, fmt), batch_size):
+        stats['read'] += len(chunk)
+        chunk, rejected = _prepare_batch(data_manager, chunk, column_map)
+        stats['rejected'] += rejected
+        if chunk.empty:
+            continue
+
+        # Within a batch the last entry per (email, date) wins; across batches
+        # and against existing history the first stored entry is kept
+        deduped = chunk.drop_duplicates(['email', 'date'], keep='last')
+        unseen = set(deduped['email'].unique()) - looked_up
+        if unseen:
+            known_keys.update(storage.existing_keys(unseen))
+            looked_up.update(unseen)
+        is_new = [key not in known_keys for key in zip(deduped['email'], deduped['date'])]
+        new_rows = deduped[is_new]
+        stats['duplicates'] += len(chunk) - len(new_rows)
+        if new_rows.empty:
+            continue
+
+        storage.append_metrics_frame(new_rows)
+        frame_cache.bump_version(storage.identity())
+        known_keys.update(zip(new_rows['email'], new_rows['date']))
+        touched.update(new_rows['email'].unique())
+        stats['imported'] += len(new_rows)
+        stats['batches'] += 1
+
+    # Backfilled rows can land before a rollup's last date, so rebuild instead of applying
+    for email in touched:
+        data_manager.rebuild_rollup(email)
+    stats['users'] = len(touched)
+    return stats
+
+
+def export_metrics(data_manager, dest, email=None, fmt=None, batch_size=BATCH_SIZE):
+    fmt = _detect_format(dest, fmt)
+    rows = 0
+    out = sys.stdout if dest == "-" else open(dest, 'w', newline='')
+    try:
+        for chunk in data_manager.storage.iter_metrics(email=email, chunksize=batch_size):
+            chunk = chunk.reindex(columns=FITNESS_COLUMNS)
+            if fmt == "jsonl":
+                lines = chunk.to_json(orient='records', lines=True)
+                out.write(lines if lines.endswith('\n') else lines + '\n')
+            else:
+                chunk.to_csv(out, header=(rows == 0), index=False, lineterminator='\n')
+            rows += len(chunk)
+        if rows == 0 and fmt == "csv":
+            pd.DataFrame(columns=FITNESS_COLUMNS).to_csv(out, index=False, lineterminator='\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return rows
+
+
+def _parse_column_map(pairs):
+    column_map = {}
+    for pair in pairs or []:
+        source, _, target = pair.partition('=')
+        if not target:
+            raise argparse.ArgumentTypeError(f"Expected SOURCE=TARGET, got {pair!r}")
+        column_map[source] = target
+    return column_map
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import/export of fitness history")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Stream a CSV/JSONL file into storage")
+    import_parser.add_argument("source", help="Input file, or - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    import_parser.add_argument("--map", action="append", metavar="SOURCE=TARGET",
+                               help="Rename an input column, e.g. --map body_mass=weight")
+
+    export_parser = subparsers.add_parser("export", help="Stream fitness history to a CSV/JSONL file")
+    export_parser.add_argument("dest", help="Output file, or - for stdout")
+    export_parser.add_argument("--email", help="Only export this user's history")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+    export_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    data_manager = DataManager()
+    if args.command == "import":
+        source = sys.stdin if args.source == "-" else args.source
+        stats = import_metrics(data_manager, source, args.format, args.batch_size,
+                               _parse_column_map(args.map))
+        print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+    else:
+        count = export_metrics(data_manager, args.dest, args.email, args.format, args.batch_size)
+        print(f"Exported {count} rows", file=sys.stderr)
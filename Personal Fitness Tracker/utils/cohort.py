@@ -0,0 +1,194 @@
+import argparse
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.data_manager import BMI_CATEGORIES, DataManager
+
+CHUNK_SIZE = 100_000
+SCAN_COLUMNS = ['email', 'date', 'weight', 'height', 'activity_level',
+                'exercise_minutes', 'calories_burned', 'sleep_hours', 'stress_level']
+NUMERIC_SCAN_COLUMNS = ['weight', 'height', 'exercise_minutes', 'calories_burned',
+                        'sleep_hours', 'stress_level']
+UNKNOWN_ACTIVITY = "Unknown"
+
+# Set in each pool worker by _init_worker
+_worker_data_manager = None
+
+
+def empty_partial():
+    return {
+        'rows': 0,
+        # email -> (date, weight, height) of the user's latest entry
+        'latest': {},
+        # activity level -> [rows, exercise sum, exercise count, calories sum, calories count]
+        'activity': {},
+        # n, sum x, sum y, sum x^2, sum y^2, sum xy for x = sleep hours, y = stress level
+        'sleep_stress': [0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    }
+
+
+def aggregate_chunk(data_manager, chunk):
+    partial = empty_partial()
+    if chunk.empty:
+        return partial
+    chunk = chunk.copy()
+    for col in NUMERIC_SCAN_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    chunk['activity_level'] = chunk['activity_level'].astype(object).where(
+        chunk['activity_level'].notna(), UNKNOWN_ACTIVITY
+    )
+    partial['rows'] = len(chunk)
+
+    # Rows saved before calories were stored get the same estimate users see
+    missing = chunk['calories_burned'].isna() & chunk['exercise_minutes'].notna()
+    if missing.any():
+        chunk.loc[missing, 'calories_burned'] = data_manager.calculate_calories_burned_vectorized(
+            chunk.loc[missing, 'weight'], chunk.loc[missing, 'exercise_minutes'],
+            chunk.loc[missing, 'activity_level']
+        )
+
+    # Partition by user: later rows win ties, matching get_latest_metrics
+    latest = chunk.sort_values('date', kind='stable').groupby('email', sort=False).tail(1)
+    partial['latest'] = {
+        email: (date, weight, height)
+        for email, date, weight, height in zip(latest['email'], latest['date'].astype(str),
+                                               latest['weight'], latest['height'])
+    }
+
+    grouped = chunk.groupby('activity_level', sort=False).agg(
+        rows=('email', 'size'),
+        exercise_sum=('exercise_minutes', 'sum'), exercise_count=('exercise_minutes', 'count'),
+        calories_sum=('calories_burned', 'sum'), calories_count=('calories_burned', 'count')
+    )
+    partial['activity'] = {level: [float(value) for value in values]
+                           for level, values in zip(grouped.index, grouped.to_numpy())}
+
+    pairs = chunk[['sleep_hours', 'stress_level']].dropna()
+    x, y = pairs['sleep_hours'].to_numpy(), pairs['stress_level'].to_numpy()
+    partial['sleep_stress'] = [len(pairs), float(x.sum()), float(y.sum()),
+                               float((x * x).sum()), float((y * y).sum()), float((x * y).sum())]
+    return partial
+
+
+def merge_partials(into, other):
+    into['rows'] += other['rows']
+    for email, entry in other['latest'].items():
+        current = into['latest'].get(email)
+        # Partials are merged in scan order, so an equal date means a later row
+        if current is None or entry[0] >= current[0]:
+            into['latest'][email] = entry
+    for level, values in other['activity'].items():
+        totals = into['activity'].setdefault(level, [0.0] * len(values))
+        for i, value in enumerate(values):
+            totals[i] += value
+    into['sleep_stress'] = [a + b for a, b in zip(into['sleep_stress'], other['sleep_stress'])]
+    return into
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy):
+    denominator = math.sqrt(max(n * sxx - sx * sx, 0.0) * max(n * syy - sy * sy, 0.0))
+    if n < 2 or denominator == 0:
+        return None
+    return (n * sxy - sx * sy) / denominator
+
+
+def finalize(data_manager, partial):
+    latest = pd.DataFrame.from_dict(partial['latest'], orient='index', columns=['date', 'weight', 'height'])
+    bmi = data_manager.calculate_bmi_vectorized(latest['weight'], latest['height'])
+    # calculate_bmi returns 0.0 for missing or invalid measurements
+    categories, _ = data_manager.get_bmi_category_vectorized(bmi[bmi > 0])
+    distribution = categories.value_counts()
+    users_with_bmi = int(distribution.sum())
+
+    activity = {}
+    for level, (rows, exercise_sum, exercise_count, calories_sum, calories_count) in sorted(partial['activity'].items()):
+        activity[level] = {
+            'rows': int(rows),
+            'avg_exercise_minutes': round(exercise_sum / exercise_count, 2) if exercise_count else None,
+            'avg_calories_burned': round(calories_sum / calories_count, 2) if calories_count else None
+        }
+
+    correlation = _pearson(*partial['sleep_stress'])
+    return {
+        'rows': partial['rows'],
+        'users': len(latest),
+        'bmi_distribution': {
+            category: {
+                'users': int(distribution.get(category, 0)),
+                'share': round(distribution.get(category, 0) / users_with_bmi, 4) if users_with_bmi else 0.0
+            }
+            for _, category, _ in BMI_CATEGORIES
+        },
+        'activity_levels': activity,
+        'sleep_stress_correlation': {
+            'pairs': int(partial['sleep_stress'][0]),
+            'pearson_r': round(correlation, 4) if correlation is not None else None
+        }
+    }
+
+
+def _init_worker(storage):
+    global _worker_data_manager
+    _worker_data_manager = DataManager(storage, write_behind=False)
+
+
+def _aggregate_in_worker(chunk):
+    return aggregate_chunk(_worker_data_manager, chunk)
+
+
+def cohort_stats(data_manager, workers=None, chunksize=CHUNK_SIZE):
+    # One streaming scan of the fitness table. Chunks are aggregated into
+    # mergeable partials in a process pool; at most two chunks per worker are
+    # in flight so memory stays bounded by the chunk size, not the table size.
+    workers = workers or os.cpu_count() or 1
+    chunks = data_manager.storage.iter_metrics(chunksize=chunksize, columns=SCAN_COLUMNS)
+    result = empty_partial()
+
+    if workers <= 1:
+        for chunk in chunks:
+            merge_partials(result, aggregate_chunk(data_manager, chunk))
+        return finalize(data_manager, result)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(data_manager.storage,)) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_aggregate_in_worker, chunk))
+            if len(in_flight) >= 2 * workers:
+                merge_partials(result, in_flight.popleft().result())
+        while in_flight:
+            merge_partials(result, in_flight.popleft().result())
+    return finalize(data_manager, result)
+
+
+def _print_report(stats):
+    print(f"{stats['rows']} entries from {stats['users']} users")
+    print("\nBMI category (latest entry per user):")
+    for category, values in stats['bmi_distribution'].items():
+        print(f"  {category:<15} {values['users']:>8}  {values['share']:.1%}")
+    print("\nBy activity level:")
+    for level, values in stats['activity_levels'].items():
+        print(f"  {level:<17} {values['rows']:>8} entries  "
+              f"avg exercise {values['avg_exercise_minutes']} min  "
+              f"avg calories {values['avg_calories_burned']} kcal")
+    correlation = stats['sleep_stress_correlation']
+    print(f"\nSleep vs stress: r = {correlation['pearson_r']} over {correlation['pairs']} entries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Population-level fitness statistics")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--json", action="store_true", help="Print the raw statistics as JSON")
+    args = parser.parse_args()
+
+    stats = cohort_stats(DataManager(), args.workers, args.chunksize)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        _print_report(stats)
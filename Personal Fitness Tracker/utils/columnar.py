@@ -0,0 +1,178 @@
+import argparse
+import glob
+import os
+import time
+import uuid
+import zlib
+
+import pandas as pd
+
+from utils import csv_store
+from utils.profiling import count
+from utils.storage import FITNESS_COLUMNS, NUMERIC_COLUMNS, CsvStorage
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency: pip install "fitness-tracker[columnar]"
+    pa = None
+
+BUCKETS = 16
+ROW_GROUP_SIZE = 64 * 1024
+# Every save adds a file to its bucket and per-user reads open all of them,
+# so a bucket is compacted once it holds more than this many
+COMPACT_THRESHOLD = 32
+
+
+def _schema():
+    return pa.schema([
+        (column, pa.float64() if column in NUMERIC_COLUMNS else pa.string())
+        for column in FITNESS_COLUMNS
+    ])
+
+
+def bucket_for(email):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(email.encode()) % BUCKETS
+
+
+class ParquetStorage(CsvStorage):
+    # Fitness history lives in Parquet files partitioned by an email hash and,
+    # once compacted, sorted by (email, date) so row-group statistics can skip
+    # other users. Users, feedback and rollups stay in the CSV/JSON files.
+    name = "parquet"
+
+    def __init__(self, data_dir="data"):
+        if pa is None:
+            raise ImportError("The parquet storage engine requires pyarrow (pip install pyarrow)")
+        super().__init__(data_dir)
+        self.fitness_dir = os.path.join(data_dir, "fitness_parquet")
+        self.schema = _schema()
+        for bucket in range(BUCKETS):
+            os.makedirs(self._bucket_dir(bucket), exist_ok=True)
+
+    def _bucket_dir(self, bucket):
+        return os.path.join(self.fitness_dir, f"bucket={bucket:02d}")
+
+    def identity(self):
+        return os.path.abspath(self.fitness_dir)
+
+    def file_version(self):
+        # Appends and compaction both add or remove files, which bumps the bucket dir mtime
+        return tuple(os.stat(self._bucket_dir(bucket)).st_mtime_ns for bucket in range(BUCKETS))
+
+    def _write_file(self, bucket, table, row_group_size=None):
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Leading dot: dataset discovery ignores the file until it is complete
+        tmp_path = os.path.join(self._bucket_dir(bucket), "." + name)
+        pq.write_table(table, tmp_path, row_group_size=row_group_size)
+        os.replace(tmp_path, os.path.join(self._bucket_dir(bucket), name))
+
+    def _to_table(self, df):
+        df = df.reindex(columns=FITNESS_COLUMNS)
+        for col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        for col in set(FITNESS_COLUMNS) - set(NUMERIC_COLUMNS):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+            df[col] = df[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+        return pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+    def append_metrics(self, row):
+        self.append_metrics_frame(pd.DataFrame([row]))
+
+    def append_metrics_frame(self, df):
+        buckets = df['email'].astype(str).map(bucket_for)
+        for bucket, part in df.groupby(buckets):
+            self._write_file(bucket, self._to_table(part))
+            if len(self._bucket_files(bucket)) > COMPACT_THRESHOLD:
+                try:
+                    with csv_store.file_lock(self.fitness_dir):
+                        self._compact_bucket(bucket)
+                except TimeoutError:
+                    pass  # the rows are saved; a later append retries the compaction
+
+    def read_user_metrics(self, email, columns=None):
+        # Only the user's bucket is opened; the email predicate and column
+        # projection are pushed down into the Parquet reader
+        columns = list(columns) if columns else FITNESS_COLUMNS
+        with csv_store.file_lock(self.fitness_dir, exclusive=False):
+            dataset = ds.dataset(self._bucket_dir(bucket_for(email)), format="parquet", schema=self.schema)
+            table = dataset.to_table(columns=columns, filter=ds.field('email') == email)
+        count('rows_read', table.num_rows, storage='parquet')
+        count('bytes_read', table.nbytes, storage='parquet')
+        return table.to_pandas()
+
+    def read_all_metrics(self):
+        with csv_store.file_lock(self.fitness_dir, exclusive=False):
+            table = ds.dataset(self.fitness_dir, format="parquet", schema=self.schema).to_table()
+        count('rows_read', table.num_rows, storage='parquet')
+        count('bytes_read', table.nbytes, storage='parquet')
+        return table.to_pandas()
+
+    def iter_metrics(self, email=None, chunksize=100_000, columns=None):
+        root = self.fitness_dir if email is None else self._bucket_dir(bucket_for(email))
+        row_filter = None if email is None else ds.field('email') == email
+        with csv_store.file_lock(self.fitness_dir, exclusive=False):
+            dataset = ds.dataset(root, format="parquet", schema=self.schema)
+            for batch in dataset.to_batches(columns=columns, filter=row_filter, batch_size=chunksize):
+                if batch.num_rows:
+                    yield batch.to_pandas()
+
+    def existing_keys(self, emails):
+        emails = sorted(set(emails))
+        if not emails:
+            return set()
+        with csv_store.file_lock(self.fitness_dir, exclusive=False):
+            table = ds.dataset(self.fitness_dir, format="parquet", schema=self.schema).to_table(
+                columns=['email', 'date'], filter=ds.field('email').isin(emails)
+            )
+        return set(zip(table.column('email').to_pylist(), table.column('date').to_pylist()))
+
+    def _bucket_files(self, bucket):
+        return sorted(glob.glob(os.path.join(self._bucket_dir(bucket), "part-*.parquet")))
+
+    def _compact_bucket(self, bucket):
+        # Caller holds the exclusive lock; returns the number of files merged
+        paths = self._bucket_files(bucket)
+        if len(paths) < 2:
+            return 0
+        table = ds.dataset(paths, format="parquet", schema=self.schema).to_table()
+        table = table.sort_by([('email', 'ascending'), ('date', 'ascending')])
+        self._write_file(bucket, table, row_group_size=ROW_GROUP_SIZE)
+        for path in paths:
+            os.remove(path)
+        return len(paths)
+
+    def compact(self):
+        with csv_store.file_lock(self.fitness_dir):
+            return sum(self._compact_bucket(bucket) for bucket in range(BUCKETS))
+
+
+def convert_csv(data_dir="data", chunksize=100_000):
+    storage = ParquetStorage(data_dir)
+    if glob.glob(os.path.join(storage.fitness_dir, "*", "part-*.parquet")):
+        raise RuntimeError(f"{storage.fitness_dir} already contains data; refusing to convert twice")
+    rows = 0
+    for chunk in pd.read_csv(os.path.join(data_dir, "fitness_data.csv"), chunksize=chunksize):
+        chunk = chunk.dropna(how='all')
+        storage.append_metrics_frame(chunk)
+        rows += len(chunk)
+    storage.compact()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) storage for fitness history")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convert data/fitness_data.csv to Parquet")
+    convert_parser.add_argument("--data-dir", default="data")
+    convert_parser.add_argument("--chunksize", type=int, default=100_000)
+    compact_parser = subparsers.add_parser("compact", help="Merge small Parquet files per bucket")
+    compact_parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        print(f"Converted {convert_csv(args.data_dir, args.chunksize)} rows")
+    elif args.command == "compact":
+        print(f"Compacted {ParquetStorage(args.data_dir).compact()} files")
@@ -0,0 +1,227 @@
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked appends
+    fcntl = None
+
+# Bounded retry policy for acquiring a file lock
+LOCK_TIMEOUT = float(os.environ.get("FITNESS_LOCK_TIMEOUT", "10"))
+INITIAL_BACKOFF = 0.001
+MAX_BACKOFF = 0.1
+
+# Files whose header has already been validated in this process
+_checked_headers = set()
+
+
+@contextmanager
+def file_lock(path, exclusive=True, timeout=None):
+    # Locks live in a sidecar file so that os.replace() on the data file
+    # never leaves a waiting writer holding a lock on the old inode
+    timeout = LOCK_TIMEOUT if timeout is None else timeout
+    with open(path + ".lock", 'a') as handle:
+        if fcntl is None:
+            yield
+            return
+        flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+        deadline = time.monotonic() + timeout
+        delay = INITIAL_BACKOFF
+        while True:
+            try:
+                fcntl.flock(handle.fileno(), flags)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for lock on {path}")
+                time.sleep(delay * (1 + random.random()))
+                delay = min(delay * 2, MAX_BACKOFF)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class _Prefix(io.RawIOBase):
+    # Reads stop at the size the file had when it was snapshotted
+    def __init__(self, raw, size):
+        self._raw = raw
+        self._remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._raw.readinto(memoryview(buffer)[:self._remaining])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def open_snapshot(path, timeout=None):
+    # The lock is only held while opening: appends land past the recorded size
+    # and compaction swaps in a new inode, so the open handle stays consistent
+    with file_lock(path, exclusive=False, timeout=timeout):
+        raw = open(path, 'rb', buffering=0)
+        size = os.fstat(raw.fileno()).st_size
+    return io.BufferedReader(_Prefix(raw, size))
+
+
+def atomic_write(path, write):
+    # Write through a temporary file in the same directory, then swap it in
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.",
+                                    suffix=f".{threading.get_ident()}.tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='') as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_header(handle):
+    handle.seek(0)
+    first_line = handle.readline()
+    if not first_line.strip():
+        return None
+    return [column.strip() for column in next(csv.reader([first_line]))]
+
+
+def ensure_header(path, columns):
+    key = os.path.abspath(path)
+    if key in _checked_headers:
+        return
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with file_lock(path), open(path, 'a+', newline='') as handle:
+        header = _read_header(handle)
+        if header is None:
+            handle.seek(0)
+            handle.truncate()
+            csv.writer(handle, lineterminator='\n').writerow(columns)
+        elif header != list(columns):
+            raise ValueError(f"Unexpected header in {path}: {header} (expected {list(columns)})")
+    _checked_headers.add(key)
+
+
+def _append_locked(path, columns, rows):
+    with open(path, 'a+', newline='') as handle:
+        # Older files were written without a trailing newline
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() > 0:
+            handle.seek(handle.tell() - 1)
+            if handle.read(1) not in ('\n', '\r'):
+                handle.write('\n')
+        writer = csv.writer(handle, lineterminator='\n')
+        for row in rows:
+            writer.writerow(['' if row.get(column) is None else row.get(column) for column in columns])
+        handle.flush()
+
+
+def append_rows(path, columns, rows):
+    ensure_header(path, columns)
+    with file_lock(path):
+        _append_locked(path, columns, rows)
+
+
+def append_row(path, columns, row):
+    append_rows(path, columns, [row])
+
+
+def append_row_if_absent(path, columns, row, key_column, exists=None, on_append=None):
+    # Check-and-append under one lock so concurrent writers can't both insert.
+    # `exists` lets callers supply a faster lookup than scanning the file and
+    # `on_append` runs while the lock is still held.
+    ensure_header(path, columns)
+    with file_lock(path):
+        if exists is not None:
+            found = exists(row[key_column])
+        else:
+            with open(path, newline='') as handle:
+                found = any(
+                    (record.get(key_column) or '').strip() == row[key_column]
+                    for record in csv.DictReader(handle)
+                )
+        if found:
+            return False
+        _append_locked(path, columns, [row])
+        if on_append is not None:
+            on_append(row)
+    return True
+
+
+def update_row(path, key_column, key, values, expected=None, on_update=None):
+    # Rewrite the first row whose key_column matches `key`. With `expected`
+    # ({column: value}) the update only applies if the row still holds those
+    # values, so two concurrent updates can't silently overwrite each other.
+    with file_lock(path):
+        with open(path, newline='') as handle:
+            rows = list(csv.reader(handle))
+        header = [value.strip() for value in rows[0]] if rows else []
+        if key_column not in header:
+            return False
+        positions = {column: header.index(column) for column in header}
+        for row in rows[1:]:
+            row.extend([''] * (len(header) - len(row)))
+            if row[positions[key_column]].strip() == key:
+                break
+        else:
+            return False
+        if expected and any(row[positions[column]].strip() != value for column, value in expected.items()):
+            return False
+        for column, value in values.items():
+            row[positions[column]] = value
+
+        def write(handle):
+            csv.writer(handle, lineterminator='\n').writerows(rows)
+
+        atomic_write(path, write)
+        if on_update is not None:
+            on_update(key, values)
+    return True
+
+
+def compact(path, columns):
+    # Rewrite the file with normalized line endings and without blank rows
+    with file_lock(path):
+        with open(path, newline='') as handle:
+            rows = [
+                [value.strip() for value in row]
+                for row in csv.reader(handle)
+                if any(value.strip() for value in row)
+            ]
+        if rows and rows[0] == list(columns):
+            rows = rows[1:]
+
+        def write(handle):
+            writer = csv.writer(handle, lineterminator='\n')
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+        atomic_write(path, write)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.csv_store data/fitness_data.csv [more files...]
+    for csv_path in sys.argv[1:]:
+        with open(csv_path, newline='') as f:
+            header = _read_header(f)
+        count = compact(csv_path, header or [])
+        print(f"{csv_path}: {count} rows")
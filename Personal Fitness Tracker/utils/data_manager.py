@@ -1,20 +1,128 @@
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from utils.figure_cache import figure_cache, user_data_version
+from utils.frame_cache import frame_cache
+from utils.profiling import trace_methods
+from utils.rollup import active_streak, apply_entry, build_rollup, rollup_averages
+from utils.storage import NUMERIC_COLUMNS, get_storage
+from utils.write_queue import get_write_queue
 
+# Rule tables are built once at import and are read-only afterwards
+
+# Upper BMI bound (exclusive), category, health tip
+BMI_CATEGORIES = (
+    (18.5, "Underweight", "Consider increasing caloric intake and strength training."),
+    (24.9, "Normal weight", "Maintain your current healthy lifestyle."),
+    (29.9, "Overweight", "Focus on cardio exercises and balanced diet."),
+    (np.inf, "Obese", "Consult a healthcare provider and start with low-impact exercises.")
+)
+# Lookup arrays for get_bmi_category_vectorized: bound index -> category / tip
+_BMI_BOUNDS = np.array([upper_bound for upper_bound, _, _ in BMI_CATEGORIES[:-1]])
+_BMI_LABELS = np.array([category for _, category, _ in BMI_CATEGORIES], dtype=object)
+_BMI_TIPS = np.array([suggestion for _, _, suggestion in BMI_CATEGORIES], dtype=object)
+
+# Rough estimation of calories burned per minute based on activity level
+CALORIES_PER_MINUTE = MappingProxyType({
+    "Sedentary": 3,
+    "Light": 4,
+    "Moderate": 6,
+    "Very Active": 8,
+    "Extremely Active": 10
+})
+DEFAULT_CALORIES_PER_MINUTE = 5
+
+EXERCISE_SUGGESTIONS = MappingProxyType({
+    "Underweight": MappingProxyType({
+        "exercises": ("Bodyweight squats", "Push-ups", "Resistance band training"),
+        "duration": "30-45 minutes",
+        "frequency": "3-4 times per week"
+    }),
+    "Normal weight": MappingProxyType({
+        "exercises": ("Running", "Cycling", "Full body workouts"),
+        "duration": "45-60 minutes",
+        "frequency": "4-5 times per week"
+    }),
+    "Overweight": MappingProxyType({
+        "exercises": ("Brisk walking", "Swimming", "Stationary cycling"),
+        "duration": "30-45 minutes",
+        "frequency": "5-6 times per week"
+    }),
+    "Obese": MappingProxyType({
+        "exercises": ("Walking", "Water aerobics", "Light yoga"),
+        "duration": "20-30 minutes",
+        "frequency": "Start with 3 times per week"
+    })
+})
+DEFAULT_SUGGESTION_CATEGORY = "Normal weight"
+
+# Chart bucket sizes (pandas offset aliases), from finest to coarsest
+AGGREGATION_BUCKETS = {
+    "Daily": "D",
+    "Weekly": "W",
+    "Monthly": "MS"
+}
+# Totals are summed per bucket, everything else is averaged with min/max kept
+METRIC_AGGREGATIONS = {
+    "weight": "mean",
+    "bmi": "mean",
+    "sleep_hours": "mean",
+    "stress_level": "mean",
+    "exercise_minutes": "sum",
+    "calories_burned": "sum"
+}
+PIXELS_PER_POINT = 4
+MIN_CHART_POINTS = 20
+
+# Range selector label -> days back from the user's latest entry (None = all)
+HISTORY_WINDOWS = {
+    "30 days": 30,
+    "90 days": 90,
+    "365 days": 365,
+    "All": None
+}
+DEFAULT_HISTORY_WINDOW = "90 days"
+HISTORY_PAGE_SIZE = 25
+
+
+def _coerce_floats(values):
+    # Floats plus a mask of values that were present but not numeric, which
+    # the scalar calculations reject; missing values just stay NaN
+    values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        floats = values.astype(float, copy=True).ravel()
+        return floats, np.zeros(len(floats), dtype=bool)
+    objects = pd.Series(values.astype(object).ravel())
+    floats = pd.to_numeric(objects, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return floats, np.isnan(floats) & objects.notna().to_numpy()
+
+
+def _as_float_array(values):
+    return _coerce_floats(values)[0]
+
+
+def _date_key(value):
+    # Dates are stored as 'YYYY-MM-DD' strings, which sort chronologically
+    return value if isinstance(value, str) else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _like_input(values, template):
+    # Return a Series aligned with the input when a Series was passed in
+    if isinstance(template, pd.Series):
+        return pd.Series(values, index=template.index)
+    return values
+
+@trace_methods
 class DataManager:
-    def __init__(self):
-        self.fitness_file = "data/fitness_data.csv"
-        self._init_fitness_file()
-
-    def _init_fitness_file(self):
-        if not os.path.exists("data"):
-            os.makedirs("data")
-        if not os.path.exists(self.fitness_file):
-            columns = ['email', 'date', 'age', 'gender', 'weight', 'height', 
-                      'activity_level', 'sleep_hours', 'stress_level', 
-                      'heart_rate', 'calories_burned', 'exercise_minutes']
-            pd.DataFrame(columns=columns).to_csv(self.fitness_file, index=False)
+    def __init__(self, storage=None, write_behind=None):
+        self.storage = storage or get_storage()
+        if write_behind is None:
+            write_behind = os.environ.get("FITNESS_WRITE_BEHIND") == "1"
+        self.write_queue = get_write_queue(self.storage) if write_behind else None
 
     def calculate_bmi(self, weight, height):
         # Ensure numeric types
@@ -24,63 +132,91 @@ class DataManager:
             height_m = height / 100  # Convert cm to m
             bmi = weight / (height_m * height_m)
             return round(bmi, 2)
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, ZeroDivisionError):
             return 0.0
 
+    def calculate_bmi_vectorized(self, weight, height):
+        weights, bad_weights = _coerce_floats(weight)
+        heights, bad_heights = _coerce_floats(height)
+        heights_m = heights / 100  # Convert cm to m
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bmi = np.round(weights / (heights_m * heights_m), 2)
+        # Same fallback as calculate_bmi for non-numeric values and zero heights
+        bmi[bad_weights | bad_heights | (heights_m == 0)] = 0.0
+        return _like_input(bmi, weight)
+
     def get_bmi_category(self, bmi):
-        if bmi < 18.5:
-            return "Underweight", "Consider increasing caloric intake and strength training."
-        elif bmi < 24.9:
-            return "Normal weight", "Maintain your current healthy lifestyle."
-        elif bmi < 29.9:
-            return "Overweight", "Focus on cardio exercises and balanced diet."
-        else:
-            return "Obese", "Consult a healthcare provider and start with low-impact exercises."
+        for upper_bound, category, suggestion in BMI_CATEGORIES[:-1]:
+            if bmi < upper_bound:
+                return category, suggestion
+        return BMI_CATEGORIES[-1][1], BMI_CATEGORIES[-1][2]
+
+    def get_bmi_category_vectorized(self, bmi):
+        # Index of the first bound the BMI is below; NaN sorts past every bound,
+        # which matches get_bmi_category's fall-through to the last category
+        index = np.searchsorted(_BMI_BOUNDS, _as_float_array(bmi), side='right')
+        return _like_input(_BMI_LABELS[index], bmi), _like_input(_BMI_TIPS[index], bmi)
 
     def get_exercise_suggestions(self, age, bmi_category, activity_level):
-        suggestions = {
-            "Underweight": {
-                "exercises": ["Bodyweight squats", "Push-ups", "Resistance band training"],
-                "duration": "30-45 minutes",
-                "frequency": "3-4 times per week"
-            },
-            "Normal weight": {
-                "exercises": ["Running", "Cycling", "Full body workouts"],
-                "duration": "45-60 minutes",
-                "frequency": "4-5 times per week"
-            },
-            "Overweight": {
-                "exercises": ["Brisk walking", "Swimming", "Stationary cycling"],
-                "duration": "30-45 minutes",
-                "frequency": "5-6 times per week"
-            },
-            "Obese": {
-                "exercises": ["Walking", "Water aerobics", "Light yoga"],
-                "duration": "20-30 minutes",
-                "frequency": "Start with 3 times per week"
-            }
-        }
-        return suggestions.get(bmi_category, suggestions["Normal weight"])
+        return EXERCISE_SUGGESTIONS.get(bmi_category, EXERCISE_SUGGESTIONS[DEFAULT_SUGGESTION_CATEGORY])
+
+    def build_recommendations(self, latest, versions):
+        # latest: one row per user (email, weight, height); versions: matching
+        # (entries, last_date) pairs used to tell when a stored plan is stale
+        bmi = self.calculate_bmi_vectorized(latest['weight'], latest['height'])
+        categories, tips = self.get_bmi_category_vectorized(bmi)
+        generated_at = datetime.now().isoformat(timespec='seconds')
+        plans = []
+        for email, version, value, category, tip in zip(latest['email'], versions, bmi, categories, tips):
+            suggestion = self.get_exercise_suggestions(None, category, None)
+            plans.append({
+                'email': email,
+                'data_version': list(version),
+                'bmi': float(value),
+                'bmi_category': category,
+                'health_tip': tip,
+                'exercises': list(suggestion['exercises']),
+                'duration': suggestion['duration'],
+                'frequency': suggestion['frequency'],
+                'generated_at': generated_at
+            })
+        return plans
+
+    def get_recommendation(self, email, rollup=None):
+        # Usually the plan written by the nightly batch (utils.recommendations);
+        # users who logged since then get theirs rebuilt from the rollup once
+        rollup = rollup or self.get_rollup(email)
+        if rollup['latest'] is None:
+            return None
+        version = list(user_data_version(rollup))
+        plan = self.storage.get_recommendation(email)
+        if plan is None or plan['data_version'] != version:
+            latest = pd.DataFrame([{**rollup['latest'], 'email': email}])
+            plan = self.build_recommendations(latest, [version])[0]
+            self.storage.put_recommendations([plan])
+        return plan
 
     def calculate_calories_burned(self, weight, exercise_minutes, activity_level):
         try:
             weight = float(weight)
             exercise_minutes = float(exercise_minutes)
-            # Rough estimation of calories burned based on activity level
-            calories_per_minute = {
-                "Sedentary": 3,
-                "Light": 4,
-                "Moderate": 6,
-                "Very Active": 8,
-                "Extremely Active": 10
-            }
-            rate = calories_per_minute.get(activity_level, 5)
+            rate = CALORIES_PER_MINUTE.get(activity_level, DEFAULT_CALORIES_PER_MINUTE)
             return round(rate * exercise_minutes * (weight / 60), 2)
         except (ValueError, TypeError):
             return 0.0
 
+    def calculate_calories_burned_vectorized(self, weight, exercise_minutes, activity_level):
+        weights, bad_weights = _coerce_floats(weight)
+        minutes, bad_minutes = _coerce_floats(exercise_minutes)
+        rates = (pd.Series(np.asarray(activity_level, dtype=object).ravel())
+                 .map(CALORIES_PER_MINUTE)
+                 .fillna(DEFAULT_CALORIES_PER_MINUTE)
+                 .to_numpy(dtype=float))
+        calories = np.round(rates * minutes * (weights / 60), 2)
+        calories[bad_weights | bad_minutes] = 0.0
+        return _like_input(calories, weight)
+
     def save_metrics(self, email, metrics):
-        fitness_df = pd.read_csv(self.fitness_file)
         metrics['email'] = email
         metrics['date'] = datetime.now().strftime('%Y-%m-%d')
 
@@ -96,36 +232,229 @@ class DataManager:
             metrics['activity_level']
         )
 
-        new_entry = pd.DataFrame([metrics])
-        fitness_df = pd.concat([fitness_df, new_entry], ignore_index=True)
-        fitness_df.to_csv(self.fitness_file, index=False)
+        if self.write_queue is not None:
+            self.write_queue.submit('metrics', metrics)
+        else:
+            self.write_metrics_batch([metrics])
+
+    def write_metrics_batch(self, rows):
+        emails = sorted({row['email'] for row in rows})
+        # The user locks keep concurrent saves from losing rollup updates;
+        # taking them in sorted order avoids lock-order deadlocks
+        with ExitStack() as stack:
+            for email in emails:
+                stack.enter_context(self.storage.user_lock(email))
+            rollups = {email: self.storage.get_rollup(email) for email in emails}
+            if len(rows) == 1:
+                self.storage.append_metrics(rows[0])
+            else:
+                self.storage.append_metrics_frame(pd.DataFrame(rows))
+            frame_cache.bump_version(self.storage.identity())
+
+            # Keep the per-user rollups current without rescanning the history
+            for row in rows:
+                rollup = rollups[row['email']]
+                if rollup is not None:
+                    rollups[row['email']] = apply_entry(rollup, row)
+            for email, rollup in rollups.items():
+                if rollup is None:
+                    rollup = build_rollup(self.get_user_metrics(email))
+                self.storage.put_rollup(email, rollup)
+                figure_cache.invalidate_user(email)
+
+    def flush_writes(self, timeout=None):
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+
+    def get_user_metrics(self, email, columns=None, start=None, end=None, limit=None):
+        # start/end are inclusive dates; limit keeps the latest N rows of the range
+        return self._cached_user_metrics(email, columns,
+                                         lambda user_metrics: self.window(user_metrics, start, end, limit))
 
-    def get_user_metrics(self, email):
-        fitness_df = pd.read_csv(self.fitness_file)
-        user_metrics = fitness_df[fitness_df['email'] == email].sort_values('date')
+    def get_recent_metrics(self, email, days, columns=None, rollup=None):
+        return self.get_user_metrics(email, columns, start=self.recent_start(email, days, rollup))
+
+    def recent_start(self, email, days, rollup=None):
+        # First day of the last `days` days of entries, counted back from the
+        # user's latest entry so users who paused logging still see their
+        # recent history; None means everything
+        last_date = (rollup or self.get_rollup(email))['last_date'] if days else None
+        try:
+            return date.fromisoformat(last_date) - timedelta(days=days - 1) if last_date else None
+        except ValueError:
+            return None
+
+    def get_user_metrics_page(self, email, cursor=None, page_size=HISTORY_PAGE_SIZE, columns=None, start=None):
+        # Newest-first pages, optionally only back to `start`. The cursor names
+        # a position as (date, offset within that date), so it stays valid when
+        # newer entries are logged.
+        page = {}
+
+        def select(user_metrics):
+            # Same bounds as window(): undated rows are left out once start is given
+            dated = user_metrics.attrs.get('dated_rows', len(user_metrics))
+            lo = bisect_left(user_metrics['date'].array, _date_key(start), 0, dated) if start is not None else 0
+            hi = dated if start is not None else len(user_metrics)
+            end = hi if cursor is None else min(self._cursor_position(user_metrics, cursor), hi)
+            first = max(end - page_size, lo)
+            page['next_cursor'] = self._make_cursor(user_metrics, first) if first > lo else None
+            return user_metrics.iloc[first:end].iloc[::-1]
+
+        rows = self._cached_user_metrics(email, columns, select)
+        return rows, page['next_cursor']
+
+    def window(self, user_metrics, start=None, end=None, limit=None):
+        # Binary search over the date-sorted frame; undated rows sort last
+        # and are left out once either bound is given
+        dates = user_metrics['date'].array
+        dated = user_metrics.attrs.get('dated_rows', len(user_metrics))
+        lo = bisect_left(dates, _date_key(start), 0, dated) if start is not None else 0
+        if end is not None:
+            hi = bisect_right(dates, _date_key(end), 0, dated)
+        else:
+            hi = dated if start is not None else len(user_metrics)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return user_metrics.iloc[lo:hi]
+
+    def _cursor_position(self, user_metrics, cursor):
+        cursor_date, _, offset = cursor.rpartition(':')
+        dated = user_metrics.attrs.get('dated_rows', len(user_metrics))
+        base = bisect_left(user_metrics['date'].array, cursor_date, 0, dated) if cursor_date else dated
+        return min(base + int(offset), len(user_metrics))
+
+    def _make_cursor(self, user_metrics, position):
+        dated = user_metrics.attrs.get('dated_rows', len(user_metrics))
+        if position >= dated:
+            return f":{position - dated}"
+        cursor_date = user_metrics['date'].array[position]
+        return f"{cursor_date}:{position - bisect_left(user_metrics['date'].array, cursor_date, 0, dated)}"
+
+    def _cached_user_metrics(self, email, columns, select):
+        if columns is not None and 'date' not in columns:
+            columns = ['date'] + list(columns)
+        identity = self.storage.identity()
+        version = frame_cache.version(identity, self.storage.file_version())
+        key = (email, tuple(columns) if columns else None)
+        return frame_cache.get_slice(identity, version, key,
+                                     lambda: self._load_user_metrics(email, columns), select)
+
+    def _load_user_metrics(self, email, columns=None):
+        user_metrics = self.storage.read_user_metrics(email, columns)
+        user_metrics = user_metrics.sort_values('date', kind='stable', na_position='last', ignore_index=True)
+        user_metrics.attrs['dated_rows'] = int(user_metrics['date'].notna().sum())
 
         # Convert numeric columns
-        numeric_columns = ['age', 'weight', 'height', 'sleep_hours', 'stress_level', 
-                         'heart_rate', 'exercise_minutes', 'calories_burned']
-        for col in numeric_columns:
+        for col in NUMERIC_COLUMNS:
             if col in user_metrics.columns:
                 user_metrics[col] = pd.to_numeric(user_metrics[col], errors='coerce')
 
         return user_metrics
 
+    def cache_stats(self):
+        return frame_cache.stats()
+
     def get_latest_metrics(self, email):
-        user_metrics = self.get_user_metrics(email)
-        if user_metrics.empty:
+        latest = self.get_rollup(email)['latest']
+        if latest is None:
             return None
-        return user_metrics.iloc[-1]
+        return pd.Series(latest)
+
+    def get_rollup(self, email):
+        rollup = self.storage.get_rollup(email)
+        if rollup is None:
+            # First access for data written before rollups existed
+            rollup = self.rebuild_rollup(email)
+        return rollup
+
+    def get_summary(self, email):
+        rollup = self.get_rollup(email)
+        return {**rollup, 'current_streak': active_streak(rollup), 'averages': rollup_averages(rollup)}
+
+    def rebuild_rollup(self, email):
+        with self.storage.user_lock(email):
+            rollup = build_rollup(self.get_user_metrics(email))
+            self.storage.put_rollup(email, rollup)
+        figure_cache.invalidate_user(email)
+        return rollup
+
+    def rebuild_rollups(self):
+        # Each user is re-read under their lock, so a save that lands during
+        # the rebuild is never overwritten by a stale rollup
+        emails = set()
+        for chunk in self.storage.iter_metrics(columns=['email']):
+            emails.update(chunk['email'].dropna())
+        for email in emails:
+            self.rebuild_rollup(email)
+        return len(emails)
+
+    def aggregate_metrics(self, user_metrics, metric, freq="D"):
+        series = pd.Series(user_metrics[metric].to_numpy(dtype=float),
+                           index=pd.to_datetime(user_metrics['date'])).dropna()
+        how = METRIC_AGGREGATIONS.get(metric, "mean")
+        if how == "sum":
+            buckets = series.resample(freq).agg(['sum', 'count'])
+        else:
+            buckets = series.resample(freq).agg(['mean', 'min', 'max', 'count'])
+        # resample() emits empty buckets for gaps in the history
+        buckets = buckets[buckets['count'] > 0].drop(columns='count')
+        buckets = buckets.rename(columns={
+            how: metric,
+            'min': f"{metric}_min",
+            'max': f"{metric}_max"
+        })
+        return buckets.rename_axis('date').reset_index()
+
+    def downsample_lttb(self, x, y, threshold):
+        # Largest-Triangle-Three-Buckets: returns the indices of the points to keep
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = len(y)
+        if threshold >= n or threshold < 3:
+            return np.arange(n)
+
+        every = (n - 2) / (threshold - 2)
+        indices = [0]
+        a = 0
+        for i in range(threshold - 2):
+            next_start = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, n)
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                           - (x[a] - x[start:end]) * (avg_y - y[a]))
+            a = start + int(np.argmax(areas))
+            indices.append(a)
+        indices.append(n - 1)
+        return np.asarray(indices)
+
+    def prepare_chart_series(self, user_metrics, metric, bucket="Auto", width_px=800):
+        max_points = max(width_px // PIXELS_PER_POINT, MIN_CHART_POINTS)
+        if bucket != "Auto":
+            chart = self.aggregate_metrics(user_metrics, metric, AGGREGATION_BUCKETS[bucket])
+        else:
+            # Totals only make sense per bucket, so coarsen them; averages get LTTB below
+            for freq in AGGREGATION_BUCKETS.values():
+                chart = self.aggregate_metrics(user_metrics, metric, freq)
+                if len(chart) <= max_points or METRIC_AGGREGATIONS.get(metric) != "sum":
+                    break
+
+        if len(chart) > max_points:
+            x = chart['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            chart = chart.iloc[self.downsample_lttb(x, chart[metric], max_points)]
+        return chart.reset_index(drop=True)
 
     def save_feedback(self, email, feedback_text):
-        feedback_file = "data/feedback.csv"
-        if not os.path.exists(feedback_file):
-            pd.DataFrame(columns=['email', 'date', 'feedback']).to_csv(feedback_file, index=False)
-
-        feedback_df = pd.read_csv(feedback_file)
-        new_feedback = pd.DataFrame([[email, datetime.now().strftime('%Y-%m-%d'), feedback_text]], 
-                                  columns=['email', 'date', 'feedback'])
-        feedback_df = pd.concat([feedback_df, new_feedback], ignore_index=True)
-        feedback_df.to_csv(feedback_file, index=False)
\ No newline at end of file
+        feedback = {
+            'email': email,
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'feedback': feedback_text
+        }
+        if self.write_queue is not None:
+            self.write_queue.submit('feedback', feedback)
+        else:
+            self.storage.append_feedback(feedback)
\ No newline at end of file
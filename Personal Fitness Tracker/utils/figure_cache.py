@@ -0,0 +1,55 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.profiling import count
+
+
+class FigureCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self._counters['hits'] += 1
+                count('cache_hits', cache='figure')
+                return figure
+            self._counters['misses'] += 1
+        count('cache_misses', cache='figure')
+
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+                self._counters['evictions'] += 1
+        return figure
+
+    def invalidate_user(self, email):
+        with self._lock:
+            for key in [k for k in self._figures if k[0] == email]:
+                del self._figures[key]
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'entries': len(self._figures), 'max_entries': self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+def user_data_version(rollup):
+    # Every write for a user bumps the rollup's entry count, and only writes
+    # for that user do, so other users' saves leave this user's figures cached
+    return (rollup['entries'], rollup['last_date'])
+
+
+# Figures are keyed by (email, metric, data version, date range, aggregation level)
+figure_cache = FigureCache(int(os.environ.get("FITNESS_FIGURE_CACHE_SIZE", "512")))
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.profiling import count
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        # identity -> (version, frame, nbytes); only the newest version is kept
+        self._tables = {}
+        # (identity, version, key) -> (frame, nbytes), least recently used first
+        self._slices = OrderedDict()
+        self._write_versions = {}
+        self._counters = {'table_hits': 0, 'table_misses': 0,
+                          'slice_hits': 0, 'slice_misses': 0, 'evictions': 0}
+
+    def bump_version(self, identity):
+        with self._lock:
+            self._write_versions[identity] = self._write_versions.get(identity, 0) + 1
+
+    def version(self, identity, file_version):
+        with self._lock:
+            return (file_version, self._write_versions.get(identity, 0))
+
+    def get_table(self, identity, version, loader):
+        with self._lock:
+            cached = self._tables.get(identity)
+            if cached is not None and cached[0] == version:
+                self._counters['table_hits'] += 1
+                count('cache_hits', cache='frame_table')
+                return cached[1]
+            self._counters['table_misses'] += 1
+        count('cache_misses', cache='frame_table')
+
+        frame = loader()
+        with self._lock:
+            self._tables[identity] = (version, frame, _frame_bytes(frame))
+            self._drop_stale(identity, version)
+            self._evict()
+        return frame
+
+    def get_slice(self, identity, version, key, loader, select=None):
+        # select narrows the cached frame (e.g. to a date window) before the
+        # defensive copy, so callers only pay for the rows they asked for
+        cache_key = (identity, version, key)
+        with self._lock:
+            cached = self._slices.get(cache_key)
+            if cached is not None:
+                self._slices.move_to_end(cache_key)
+                self._counters['slice_hits'] += 1
+                count('cache_hits', cache='frame_slice')
+                return (select(cached[0]) if select else cached[0]).copy()
+            self._counters['slice_misses'] += 1
+        count('cache_misses', cache='frame_slice')
+
+        frame = loader()
+        with self._lock:
+            self._slices[cache_key] = (frame, _frame_bytes(frame))
+            self._drop_stale(identity, version)
+            self._evict()
+        return (select(frame) if select else frame).copy()
+
+    def _drop_stale(self, identity, version):
+        for cache_key in [k for k in self._slices if k[0] == identity and k[1] != version]:
+            del self._slices[cache_key]
+
+    def _used_bytes(self):
+        return (sum(entry[2] for entry in self._tables.values())
+                + sum(entry[1] for entry in self._slices.values()))
+
+    def _evict(self):
+        while self._slices and self._used_bytes() > self.max_bytes:
+            self._slices.popitem(last=False)
+            self._counters['evictions'] += 1
+        # A table larger than the whole budget is not worth holding on to
+        for identity in [i for i, entry in self._tables.items() if entry[2] > self.max_bytes]:
+            del self._tables[identity]
+            self._counters['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['tables'] = len(self._tables)
+            stats['slices'] = len(self._slices)
+            stats['bytes'] = self._used_bytes()
+            stats['max_bytes'] = self.max_bytes
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._slices.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+# Shared by every DataManager in the process (Streamlit runs sessions as threads)
+frame_cache = FrameCache(int(os.environ.get("FITNESS_CACHE_MB", "64")) * 1024 * 1024)
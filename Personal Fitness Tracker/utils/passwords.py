@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Cost is the scrypt N parameter (a power of two) or the PBKDF2 iteration count
+ALGORITHM = os.environ.get("FITNESS_PASSWORD_KDF", "scrypt")
+DEFAULT_COSTS = {"scrypt": 2 ** 14, "pbkdf2_sha256": 600_000}
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+# Hashing runs on a small pool so a burst of logins can't take every core
+# (scrypt also needs 128 * N * r bytes per hash); callers beyond
+# workers + queue wait at most `timeout` seconds before getting HasherBusy
+WORKERS = int(os.environ.get("FITNESS_HASH_WORKERS", "2"))
+QUEUE = int(os.environ.get("FITNESS_HASH_QUEUE", "32"))
+TIMEOUT = float(os.environ.get("FITNESS_HASH_TIMEOUT", "10"))
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def _derive(algorithm, cost, password, salt):
+    if algorithm == "scrypt":
+        return hashlib.scrypt(password.encode(), salt=salt, n=cost, r=SCRYPT_R, p=SCRYPT_P,
+                              maxmem=256 * cost * SCRYPT_R, dklen=KEY_BYTES)
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, cost, dklen=KEY_BYTES)
+    raise ValueError(f"Unknown password algorithm: {algorithm}")
+
+
+def hash_password(password, algorithm=ALGORITHM, cost=None):
+    # Encoded as algorithm$cost$salt$hash so old hashes stay verifiable after
+    # the configured algorithm or cost changes
+    cost = cost or DEFAULT_COSTS[algorithm]
+    salt = os.urandom(SALT_BYTES)
+    return f"{algorithm}${cost}${_b64(salt)}${_b64(_derive(algorithm, cost, password, salt))}"
+
+
+def verify_password(password, stored, algorithm=ALGORITHM, cost=None):
+    # Returns (matches, needs_rehash)
+    cost = cost or DEFAULT_COSTS[algorithm]
+    if '$' not in stored:
+        # Legacy unsalted SHA-256 hex digest
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    try:
+        stored_algorithm, stored_cost, salt, expected = stored.split('$')
+        expected = base64.b64decode(expected)
+        derived = _derive(stored_algorithm, int(stored_cost), password, base64.b64decode(salt))
+    except ValueError:  # malformed hash or unknown algorithm
+        return False, False
+    matches = hmac.compare_digest(derived, expected)
+    return matches, (stored_algorithm, int(stored_cost)) != (algorithm, cost)
+
+
+class PasswordHasher:
+    def __init__(self, algorithm=ALGORITHM, cost=None, workers=WORKERS, queue=QUEUE, timeout=TIMEOUT):
+        self.algorithm = algorithm
+        self.cost = cost or int(os.environ.get("FITNESS_PASSWORD_COST", DEFAULT_COSTS[algorithm]))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def _run(self, fn, *args):
+        # hashlib releases the GIL while deriving, so reruns of other sessions
+        # keep running while a login waits here
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy("Too many logins in progress")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.algorithm, self.cost)
+
+    def verify(self, password, stored):
+        return self._run(verify_password, password, stored, self.algorithm, self.cost)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    # One pool per process, shared by every AuthManager
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
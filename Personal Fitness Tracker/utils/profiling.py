@@ -0,0 +1,205 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tracing is decided once at startup: when it is off, @traced returns the
+# function unchanged and span() hands back a shared no-op context manager
+ENABLED = os.environ.get("FITNESS_TRACE") == "1"
+PROFILE_MODE = os.environ.get("FITNESS_PROFILE", "")  # "", "cprofile" or "pyinstrument"
+PROFILE_DIR = os.environ.get("FITNESS_PROFILE_DIR", "data/profiles")
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+logger = logging.getLogger("fitness.trace")
+_NOOP = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+# span name -> [count, total seconds, per-bucket counts]
+_durations = {}
+# (counter name, sorted label items) -> value
+_counters = {}
+_server = None
+
+if ENABLED and os.environ.get("FITNESS_TRACE_LOG"):
+    _handler = logging.FileHandler(os.environ["FITNESS_TRACE_LOG"])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        _stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = _stack()
+        stack.pop()
+        with _lock:
+            entry = _durations.setdefault(self.name, [0, 0.0, [0] * len(DURATION_BUCKETS)])
+            entry[0] += 1
+            entry[1] += elapsed
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    entry[2][i] += 1
+        logger.info(json.dumps({
+            'span': self.name,
+            'parent': stack[-1].name if stack else None,
+            'depth': len(stack),
+            'duration_ms': round(elapsed * 1000, 3),
+            'error': exc_type.__name__ if exc_type else None,
+            **self.attrs
+        }, default=str))
+        return False
+
+
+def span(name, **attrs):
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def traced(name=None):
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(cls):
+    # Wrap every public method of a class in a span named Class.method
+    if ENABLED:
+        for attr, value in list(vars(cls).items()):
+            if callable(value) and not attr.startswith("_"):
+                setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+def count(name, value=1, **labels):
+    # Counters such as rows_read / bytes_read / cache hits; the innermost open
+    # span also gets the value so the structured log shows where it happened
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    stack = _stack()
+    if stack:
+        stack[-1].attrs[name] = stack[-1].attrs.get(name, 0) + value
+
+
+def _labels(items):
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+def render_prometheus():
+    from utils.figure_cache import figure_cache
+    from utils.frame_cache import frame_cache
+
+    lines = ["# TYPE fitness_span_duration_seconds histogram"]
+    with _lock:
+        for span_name, (total_count, total_seconds, buckets) in sorted(_durations.items()):
+            for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'fitness_span_duration_seconds_bucket{{span="{span_name}",le="{bound}"}} {bucket_count}')
+            lines.append(f'fitness_span_duration_seconds_bucket{{span="{span_name}",le="+Inf"}} {total_count}')
+            lines.append(f'fitness_span_duration_seconds_sum{{span="{span_name}"}} {total_seconds}')
+            lines.append(f'fitness_span_duration_seconds_count{{span="{span_name}"}} {total_count}')
+        counters = sorted(_counters.items())
+    previous = None
+    for (counter_name, labels), value in counters:
+        if counter_name != previous:
+            lines.append(f"# TYPE fitness_{counter_name}_total counter")
+            previous = counter_name
+        lines.append(f"fitness_{counter_name}_total{_labels(labels)} {value}")
+    for cache_name, stats in (("frame_cache", frame_cache.stats()), ("figure_cache", figure_cache.stats())):
+        for stat, value in sorted(stats.items()):
+            lines.append(f"fitness_{cache_name}_{stat} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None):
+    # Serves /metrics on localhost once per process (FITNESS_METRICS_PORT)
+    global _server
+    port = port or os.environ.get("FITNESS_METRICS_PORT")
+    if not ENABLED or not port:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+@contextmanager
+def profile_rerun(label="rerun"):
+    # Opt-in per-rerun capture: FITNESS_PROFILE=cprofile writes .prof files for
+    # snakeviz/pstats, FITNESS_PROFILE=pyinstrument writes HTML reports
+    if not PROFILE_MODE:
+        yield
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{label}-{time.time_ns()}")
+    if PROFILE_MODE == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path + ".html", "w") as f:
+                f.write(profiler.output_html())
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path + ".prof")
@@ -0,0 +1,45 @@
+import argparse
+
+import pandas as pd
+
+from utils.data_manager import DataManager
+
+CHUNK_SIZE = 100_000
+WRITE_BATCH = 1_000
+SCAN_COLUMNS = ['email', 'date', 'weight', 'height']
+
+
+def latest_per_user(storage, chunksize=CHUNK_SIZE):
+    # One streaming pass: keeps each user's latest row plus their entry count,
+    # which together match the rollup's data version (entries, last_date)
+    latest = pd.DataFrame(columns=SCAN_COLUMNS)
+    entries = pd.Series(dtype=float)
+    for chunk in storage.iter_metrics(chunksize=chunksize, columns=SCAN_COLUMNS):
+        if chunk.empty:
+            continue
+        chunk = chunk.assign(date=chunk['date'].astype(str))
+        entries = entries.add(chunk['email'].value_counts(), fill_value=0)
+        # Earlier rows go first, so the stable sort lets later rows win date ties
+        candidates = pd.concat([latest, chunk], ignore_index=True) if len(latest) else chunk
+        latest = candidates.sort_values('date', kind='stable').groupby('email', sort=False).tail(1)
+    latest = latest.reset_index(drop=True)
+    return latest, entries.reindex(latest['email']).astype(int).tolist()
+
+
+def generate_recommendations(data_manager, chunksize=CHUNK_SIZE):
+    latest, entries = latest_per_user(data_manager.storage, chunksize)
+    versions = list(zip(entries, latest['date']))
+    plans = data_manager.build_recommendations(latest, versions)
+    for start in range(0, len(plans), WRITE_BATCH):
+        data_manager.storage.put_recommendations(plans[start:start + WRITE_BATCH])
+    return len(plans)
+
+
+if __name__ == "__main__":
+    # Meant to run nightly, e.g. from cron: python -m utils.recommendations
+    parser = argparse.ArgumentParser(description="Precompute exercise plans for every user")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    count = generate_recommendations(DataManager(), args.chunksize)
+    print(f"Wrote recommendations for {count} users")
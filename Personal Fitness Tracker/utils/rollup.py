@@ -0,0 +1,99 @@
+import math
+from datetime import date, timedelta
+
+# Metrics whose running sums are kept so averages are available without a scan
+AVERAGED_METRICS = ['weight', 'sleep_hours', 'stress_level', 'heart_rate', 'exercise_minutes']
+TOTALED_METRICS = ['exercise_minutes', 'calories_burned']
+
+
+def _native(value):
+    # numpy scalars -> plain Python values so the rollup stays JSON-serializable
+    if hasattr(value, 'item'):
+        value = value.item()
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not math.isnan(value)
+
+
+def empty_rollup():
+    return {
+        'entries': 0,
+        'latest': None,
+        'previous_weight': None,
+        'last_date': None,
+        'current_streak': 0,
+        'longest_streak': 0,
+        'totals': {metric: 0.0 for metric in TOTALED_METRICS},
+        'sums': {metric: 0.0 for metric in AVERAGED_METRICS},
+        'counts': {metric: 0 for metric in AVERAGED_METRICS}
+    }
+
+
+def apply_entry(rollup, entry):
+    # Returns the updated rollup, or None if the entry predates the rollup
+    # and the streaks can only be recomputed from the full history
+    entry = {key: _native(value) for key, value in entry.items()}
+    entry_date = str(entry['date'])
+    last_date = rollup['last_date']
+    if last_date is not None and entry_date < last_date:
+        return None
+
+    rollup = {
+        **rollup,
+        'totals': dict(rollup['totals']),
+        'sums': dict(rollup['sums']),
+        'counts': dict(rollup['counts'])
+    }
+    rollup['entries'] += 1
+    if rollup['latest'] is not None:
+        rollup['previous_weight'] = rollup['latest'].get('weight')
+    rollup['latest'] = entry
+
+    for metric in TOTALED_METRICS:
+        if _is_number(entry.get(metric)):
+            rollup['totals'][metric] += entry[metric]
+    for metric in AVERAGED_METRICS:
+        if _is_number(entry.get(metric)):
+            rollup['sums'][metric] += entry[metric]
+            rollup['counts'][metric] += 1
+
+    if entry_date != last_date:
+        next_day = None
+        if last_date is not None:
+            next_day = (date.fromisoformat(last_date) + timedelta(days=1)).isoformat()
+        rollup['current_streak'] = rollup['current_streak'] + 1 if entry_date == next_day else 1
+        rollup['longest_streak'] = max(rollup['longest_streak'], rollup['current_streak'])
+        rollup['last_date'] = entry_date
+    return rollup
+
+
+def build_rollup(user_metrics):
+    rollup = empty_rollup()
+    for entry in user_metrics.sort_values('date', kind='stable').to_dict('records'):
+        rollup = apply_entry(rollup, entry)
+    return rollup
+
+
+def active_streak(rollup, today=None):
+    # The stored streak only changes when an entry arrives, so it lapses to 0
+    # once the user has missed a day since their last entry
+    yesterday = ((today or date.today()) - timedelta(days=1)).isoformat()
+    last_date = rollup['last_date']
+    return rollup['current_streak'] if last_date is not None and last_date >= yesterday else 0
+
+
+def rollup_averages(rollup):
+    return {
+        metric: rollup['sums'][metric] / rollup['counts'][metric]
+        for metric in AVERAGED_METRICS
+        if rollup['counts'][metric]
+    }
+
+
+if __name__ == "__main__":
+    # Rebuild every user's rollup from the raw fitness log
+    from utils.data_manager import DataManager
+
+    print(f"Rebuilt rollups for {DataManager().rebuild_rollups()} users")
@@ -0,0 +1,151 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Column -> (kind, min, max, decimals). Bounds mirror the inputs show_profile
+# validates; a column is only downcast when every value fits, otherwise it
+# falls back to float64 so compacting never changes a stored value.
+FITNESS_SCHEMA = {
+    'email': ('category', None, None, None),
+    'date': ('date', None, None, None),
+    'age': ('integer', 1, 120, None),
+    'gender': ('category', None, None, None),
+    'weight': ('float', 20, 300, 2),
+    'height': ('float', 50, 300, 2),
+    'activity_level': ('category', None, None, None),
+    'sleep_hours': ('float', 0, 24, 2),
+    'stress_level': ('integer', 1, 10, None),
+    'heart_rate': ('integer', 40, 200, None),
+    'exercise_minutes': ('integer', 0, 300, None),
+    'calories_burned': ('float', 0, None, 2)
+}
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _integer_dtype(low, high):
+    for dtype in ("UInt8", "UInt16", "UInt32") if low >= 0 else ("Int8", "Int16", "Int32"):
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "Int64"
+
+
+def _in_range(values, low, high):
+    present = values[~np.isnan(values)]
+    return ((low is None or (present >= low).all()) and
+            (high is None or (present <= high).all()))
+
+
+def compact_column(series, kind, low=None, high=None, decimals=None):
+    if kind == 'category':
+        return series.astype('category')
+    if kind == 'date':
+        # Dates repeat across users, so only the distinct labels are parsed
+        labels = series.astype('category')
+        parsed = pd.to_datetime(labels.cat.categories, errors='coerce', format='mixed')
+        # Unparseable dates would turn into NaT, so keep those as labels
+        if parsed.isna().any():
+            return labels
+        codes = labels.cat.codes.to_numpy()
+        return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT),
+                         index=series.index, name=series.name)
+
+    numeric = pd.to_numeric(series, errors='coerce')
+    values = numeric.to_numpy(dtype=float)
+    if not _in_range(values, low, high):
+        return numeric.astype(float)
+    if kind == 'integer':
+        present = values[~np.isnan(values)]
+        if (present == np.round(present)).all():
+            return numeric.astype(_integer_dtype(low, high))
+        return numeric.astype(float)
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(float).round(decimals), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return numeric.astype(float)
+
+
+def csv_dtypes(schema=FITNESS_SCHEMA):
+    # Text columns are parsed straight into categoricals, so the reader never
+    # materializes one string object per row
+    return {col: 'category' for col, (kind, _, _, _) in schema.items() if kind in ('category', 'date')}
+
+
+def compact_frame(df, schema=FITNESS_SCHEMA):
+    return pd.DataFrame({
+        col: compact_column(df[col], *schema[col]) if col in schema else df[col]
+        for col in df.columns
+    }, index=df.index)
+
+
+def expand_frame(df, schema=FITNESS_SCHEMA):
+    # Back to the representation the pages and rollups expect: text labels,
+    # 'YYYY-MM-DD' date strings and float64 numbers
+    expanded = df.copy()
+    for col in expanded.columns:
+        if col not in schema:
+            continue
+        kind, _, _, decimals = schema[col]
+        series = expanded[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            expanded[col] = series.astype('str')
+        elif kind == 'date':
+            expanded[col] = series.dt.strftime(DATE_FORMAT)
+        elif series.dtype == np.float32:
+            expanded[col] = series.astype(float).round(decimals)
+        elif kind in ('integer', 'float'):
+            expanded[col] = series.astype(float)
+    return expanded
+
+
+def memory_report(raw, compact):
+    raw_bytes = raw.memory_usage(index=False, deep=True)
+    compact_bytes = compact.memory_usage(index=False, deep=True)
+    columns = {
+        col: {
+            'raw_dtype': str(raw[col].dtype),
+            'compact_dtype': str(compact[col].dtype),
+            'raw_bytes': int(raw_bytes[col]),
+            'compact_bytes': int(compact_bytes[col])
+        }
+        for col in raw.columns
+    }
+    total_raw, total_compact = int(raw_bytes.sum()), int(compact_bytes.sum())
+    return {
+        'rows': len(raw),
+        'columns': columns,
+        'raw_bytes': total_raw,
+        'compact_bytes': total_compact,
+        'ratio': round(total_compact / total_raw, 4) if total_raw else None
+    }
+
+
+def _time_groupby(df, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        df.groupby('activity_level', observed=True)['exercise_minutes'].mean()
+        df.groupby('email', observed=True)['weight'].last()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    from utils.storage import CsvStorage
+
+    parser = argparse.ArgumentParser(description="Memory footprint of the fitness table, raw vs compact")
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    storage = CsvStorage(args.data_dir)
+    raw = storage.read_all_metrics()
+    compact = storage.read_all_metrics(compact=True)
+    report = memory_report(raw, compact)
+    print(f"{report['rows']} rows")
+    print(f"{'column':<18} {'raw dtype':<16} {'compact dtype':<16} {'raw':>12} {'compact':>12}")
+    for col, info in report['columns'].items():
+        print(f"{col:<18} {info['raw_dtype']:<16} {info['compact_dtype']:<16} "
+              f"{info['raw_bytes']:>12,} {info['compact_bytes']:>12,}")
+    print(f"{'total':<52} {report['raw_bytes']:>12,} {report['compact_bytes']:>12,}  ({report['ratio']:.1%})")
+    if report['rows']:
+        print(f"group-by: raw {_time_groupby(raw):.1f} ms, compact {_time_groupby(compact):.1f} ms")
@@ -0,0 +1,30 @@
+import streamlit as st
+from utils.auth import AuthManager
+from utils.figure_cache import user_data_version
+
+
+# Managers are process-level resources shared by every session and rerun
+@st.cache_resource
+def get_auth_manager():
+    return AuthManager()
+
+
+@st.cache_resource
+def get_data_manager():
+    from utils.data_manager import DataManager
+
+    return DataManager()
+
+
+def get_session_metrics(data_manager, email, days=None):
+    # Reruns reuse the user's metrics (the last `days` days of them, or all)
+    # until this user's data or the selected range changes; the rollup version
+    # ignores other users' saves, like the figure cache
+    rollup = data_manager.get_rollup(email)
+    key = (email, days, user_data_version(rollup))
+    memo = st.session_state.get('_metrics_memo')
+    if memo is None or memo['key'] != key:
+        memo = {'key': key, 'metrics': data_manager.get_recent_metrics(email, days, rollup=rollup)}
+        st.session_state['_metrics_memo'] = memo
+    # Pages add derived columns, so hand out a copy
+    return memo['metrics'].copy()
@@ -0,0 +1,412 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+# pandas (and utils.schema) are imported inside the metric readers: the login
+# page only touches the user store, which needs nothing beyond csv/sqlite3
+from utils import csv_store
+from utils.frame_cache import frame_cache
+from utils.profiling import count
+from utils.user_index import user_index
+
+FITNESS_COLUMNS = ['email', 'date', 'age', 'gender', 'weight', 'height',
+                   'activity_level', 'sleep_hours', 'stress_level',
+                   'heart_rate', 'calories_burned', 'exercise_minutes']
+NUMERIC_COLUMNS = ['age', 'weight', 'height', 'sleep_hours', 'stress_level',
+                   'heart_rate', 'exercise_minutes', 'calories_burned']
+FEEDBACK_COLUMNS = ['email', 'date', 'feedback']
+USER_COLUMNS = ['email', 'password', 'name']
+
+
+class CsvStorage:
+    name = "csv"
+
+    def __init__(self, data_dir="data"):
+        self.data_dir = data_dir
+        self.fitness_file = os.path.join(data_dir, "fitness_data.csv")
+        self.feedback_file = os.path.join(data_dir, "feedback.csv")
+        self.users_file = os.path.join(data_dir, "users.csv")
+        self.rollup_dir = os.path.join(data_dir, "rollups")
+        self.recommendation_dir = os.path.join(data_dir, "recommendations")
+        for directory in (self.rollup_dir, self.recommendation_dir):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+        csv_store.ensure_header(self.fitness_file, FITNESS_COLUMNS)
+        csv_store.ensure_header(self.users_file, USER_COLUMNS)
+
+    def identity(self):
+        return os.path.abspath(self.fitness_file)
+
+    def file_version(self):
+        stat = os.stat(self.fitness_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def append_metrics(self, row):
+        csv_store.append_row(self.fitness_file, FITNESS_COLUMNS, row)
+
+    def read_user_metrics(self, email, columns=None):
+        from utils.schema import expand_frame
+
+        identity = self.identity()
+        version = frame_cache.version(identity, self.file_version())
+        # The cached table is held compact (categorical/downcast dtypes); only
+        # the requested user's rows are expanded back to the regular types
+        fitness_df = frame_cache.get_table(identity, version, lambda: self.read_all_metrics(compact=True))
+        user_metrics = fitness_df[fitness_df['email'] == email]
+        return expand_frame(user_metrics[list(columns)] if columns else user_metrics)
+
+    def read_all_metrics(self, compact=False):
+        import pandas as pd
+        from utils.schema import compact_frame, csv_dtypes
+
+        # Shared lock so a reader never sees a half-written append or compaction
+        with csv_store.file_lock(self.fitness_file, exclusive=False):
+            fitness_df = pd.read_csv(self.fitness_file, dtype=csv_dtypes() if compact else None)
+            count('bytes_read', os.path.getsize(self.fitness_file), storage='csv')
+        count('rows_read', len(fitness_df), storage='csv')
+        return compact_frame(fitness_df) if compact else fitness_df
+
+    def append_metrics_frame(self, df):
+        rows = df.reindex(columns=FITNESS_COLUMNS).astype(object)
+        csv_store.append_rows(self.fitness_file, FITNESS_COLUMNS,
+                              rows.where(rows.notna(), None).to_dict('records'))
+
+    def iter_metrics(self, email=None, chunksize=100_000, columns=None):
+        import pandas as pd
+
+        # Streams the rows present when iteration starts without holding the lock
+        with csv_store.open_snapshot(self.fitness_file) as handle:
+            for chunk in pd.read_csv(handle, chunksize=chunksize, usecols=columns):
+                yield chunk if email is None else chunk[chunk['email'] == email]
+
+    def existing_keys(self, emails):
+        emails = set(emails)
+        keys = set()
+        for chunk in self.iter_metrics(columns=['email', 'date']):
+            chunk = chunk[chunk['email'].isin(emails)]
+            keys.update(zip(chunk['email'], chunk['date']))
+        return keys
+
+    def _user_file(self, directory, email):
+        return os.path.join(directory, hashlib.sha256(email.encode()).hexdigest()[:32] + ".json")
+
+    def _rollup_path(self, email):
+        return self._user_file(self.rollup_dir, email)
+
+    def _read_json(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def get_rollup(self, email):
+        return self._read_json(self._rollup_path(email))
+
+    def put_rollup(self, email, rollup):
+        csv_store.atomic_write(self._rollup_path(email), lambda f: json.dump(rollup, f))
+
+    def get_recommendation(self, email):
+        return self._read_json(self._user_file(self.recommendation_dir, email))
+
+    def put_recommendations(self, plans):
+        for plan in plans:
+            csv_store.atomic_write(self._user_file(self.recommendation_dir, plan['email']),
+                                   lambda f, plan=plan: json.dump(plan, f))
+
+    def user_lock(self, email):
+        return csv_store.file_lock(self._rollup_path(email))
+
+    def append_feedback(self, row):
+        csv_store.append_row(self.feedback_file, FEEDBACK_COLUMNS, row)
+
+    def get_user(self, email):
+        return user_index(self.users_file).get(email)
+
+    def add_user(self, row):
+        index = user_index(self.users_file)
+        return csv_store.append_row_if_absent(
+            self.users_file, USER_COLUMNS, row, 'email',
+            exists=lambda email: index.get(email, lock=False) is not None,
+            on_append=index.add
+        )
+
+    def update_password(self, email, password, expected=None):
+        # Only replaces `expected` (the hash that was just verified), so a
+        # concurrent change to the same account is never overwritten
+        index = user_index(self.users_file)
+        return csv_store.update_row(
+            self.users_file, 'email', email, {'password': password},
+            expected={'password': expected} if expected is not None else None,
+            on_update=index.update
+        )
+
+
+class SQLiteStorage:
+    name = "sqlite"
+
+    def __init__(self, db_path="data/fitness.db"):
+        self.db_path = db_path
+        self.lock_dir = os.path.join(os.path.dirname(db_path), "locks")
+        if not os.path.exists(self.lock_dir):
+            os.makedirs(self.lock_dir)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS fitness (
+                    id INTEGER PRIMARY KEY,
+                    email TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    age REAL,
+                    gender TEXT,
+                    weight REAL,
+                    height REAL,
+                    activity_level TEXT,
+                    sleep_hours REAL,
+                    stress_level REAL,
+                    heart_rate REAL,
+                    calories_burned REAL,
+                    exercise_minutes REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_fitness_email_date ON fitness (email, date);
+                CREATE TABLE IF NOT EXISTS users (
+                    email TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    name TEXT
+                );
+                CREATE TABLE IF NOT EXISTS feedback (
+                    id INTEGER PRIMARY KEY,
+                    email TEXT,
+                    date TEXT,
+                    feedback TEXT
+                );
+                CREATE TABLE IF NOT EXISTS rollups (
+                    email TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    email TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL
+                );
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _insert(self, conn, table, columns, rows):
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            ([row.get(column) for column in columns] for row in rows)
+        )
+
+    def identity(self):
+        return os.path.abspath(self.db_path)
+
+    def file_version(self):
+        # Commits from other processes land in the WAL file first
+        version = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def append_metrics(self, row):
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, "fitness", FITNESS_COLUMNS, [row])
+
+    def read_user_metrics(self, email, columns=None):
+        import pandas as pd
+
+        columns = [column for column in (columns or FITNESS_COLUMNS) if column in FITNESS_COLUMNS]
+        with closing(self._connect()) as conn:
+            user_metrics = pd.read_sql_query(
+                f"SELECT {', '.join(columns)} FROM fitness WHERE email = ? ORDER BY date, id",
+                conn, params=(email,)
+            )
+        count('rows_read', len(user_metrics), storage='sqlite')
+        return user_metrics
+
+    def read_all_metrics(self):
+        import pandas as pd
+
+        with closing(self._connect()) as conn:
+            fitness_df = pd.read_sql_query(
+                f"SELECT {', '.join(FITNESS_COLUMNS)} FROM fitness ORDER BY email, date, id", conn
+            )
+        count('rows_read', len(fitness_df), storage='sqlite')
+        return fitness_df
+
+    def append_metrics_frame(self, df):
+        rows = df.reindex(columns=FITNESS_COLUMNS).astype(object)
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, "fitness", FITNESS_COLUMNS, rows.where(rows.notna(), None).to_dict('records'))
+
+    def iter_metrics(self, email=None, chunksize=100_000, columns=None):
+        import pandas as pd
+
+        columns = list(columns or FITNESS_COLUMNS)
+        query = f"SELECT {', '.join(columns)} FROM fitness"
+        params = ()
+        if email is not None:
+            query += " WHERE email = ?"
+            params = (email,)
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(query + " ORDER BY email, date, id", params)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=columns)
+
+    def existing_keys(self, emails):
+        emails = list(set(emails))
+        keys = set()
+        with closing(self._connect()) as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(emails), 500):
+                batch = emails[start:start + 500]
+                keys.update(conn.execute(
+                    f"SELECT email, date FROM fitness WHERE email IN ({', '.join('?' for _ in batch)})",
+                    batch
+                ).fetchall())
+        return keys
+
+    def get_rollup(self, email):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT payload FROM rollups WHERE email = ?", (email,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_rollup(self, email, rollup):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO rollups (email, payload) VALUES (?, ?)",
+                         (email, json.dumps(rollup)))
+
+    def get_recommendation(self, email):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT payload FROM recommendations WHERE email = ?", (email,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_recommendations(self, plans):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO recommendations (email, payload) VALUES (?, ?)",
+                             [(plan['email'], json.dumps(plan)) for plan in plans])
+
+    def user_lock(self, email):
+        # Serializes read-modify-write of a user's rollup across processes
+        name = hashlib.sha256(email.encode()).hexdigest()[:32]
+        return csv_store.file_lock(os.path.join(self.lock_dir, name))
+
+    def append_feedback(self, row):
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, "feedback", FEEDBACK_COLUMNS, [row])
+
+    def get_user(self, email):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT email, password, name FROM users WHERE email = ?", (email,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(USER_COLUMNS, row))
+
+    def add_user(self, row):
+        try:
+            with closing(self._connect()) as conn, conn:
+                self._insert(conn, "users", USER_COLUMNS, [row])
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update_password(self, email, password, expected=None):
+        query = "UPDATE users SET password = ? WHERE email = ?"
+        params = (password, email)
+        if expected is not None:
+            query += " AND password = ?"
+            params += (expected,)
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(query, params).rowcount > 0
+
+
+def get_storage():
+    engine = os.environ.get("FITNESS_STORAGE", "csv").lower()
+    if engine == "sqlite":
+        return SQLiteStorage(os.environ.get("FITNESS_DB_PATH", "data/fitness.db"))
+    if engine == "csv":
+        return CsvStorage(os.environ.get("FITNESS_DATA_DIR", "data"))
+    if engine == "parquet":
+        from utils.columnar import ParquetStorage
+        return ParquetStorage(os.environ.get("FITNESS_DATA_DIR", "data"))
+    raise ValueError(f"Unknown storage engine: {engine}")
+
+
+def _csv_chunks(path, columns, numeric_columns=(), chunksize=100_000):
+    import pandas as pd
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    for df in pd.read_csv(path, skipinitialspace=True, chunksize=chunksize):
+        df = df.dropna(how='all')
+        for col in df.columns:
+            if pd.api.types.is_string_dtype(df[col]):
+                stripped = df[col].str.strip()
+                df[col] = stripped.where(stripped != '')
+        for col in numeric_columns:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.reindex(columns=columns).astype(object)
+        yield df.where(df.notna(), None)
+
+
+def migrate_csv_to_sqlite(data_dir="data", db_path="data/fitness.db", chunksize=100_000):
+    target = SQLiteStorage(db_path)
+    with closing(target._connect()) as conn:
+        existing = conn.execute("SELECT COUNT(*) FROM fitness").fetchone()[0]
+        existing += conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    if existing:
+        raise RuntimeError(f"{db_path} already contains data; refusing to migrate twice")
+
+    counts = {'fitness': 0, 'users': 0, 'feedback': 0, 'skipped': 0}
+    # Streamed chunk by chunk, all in one transaction so a failure leaves the database empty
+    with closing(target._connect()) as conn, conn:
+        for chunk in _csv_chunks(os.path.join(data_dir, "fitness_data.csv"),
+                                 FITNESS_COLUMNS, NUMERIC_COLUMNS, chunksize):
+            # The fitness table requires an email and date, so rows missing
+            # either are counted as skipped instead of aborting the migration
+            keep = chunk['email'].notna() & chunk['date'].notna()
+            target._insert(conn, "fitness", FITNESS_COLUMNS, chunk[keep].to_dict('records'))
+            counts['fitness'] += int(keep.sum())
+            counts['skipped'] += int((~keep).sum())
+        for chunk in _csv_chunks(os.path.join(data_dir, "users.csv"), USER_COLUMNS, chunksize=chunksize):
+            # Keep the first registration if the CSV ever picked up a duplicate email
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (email, password, name) VALUES (?, ?, ?)",
+                chunk[USER_COLUMNS].itertuples(index=False, name=None)
+            )
+            counts['users'] += len(chunk)
+        for chunk in _csv_chunks(os.path.join(data_dir, "feedback.csv"), FEEDBACK_COLUMNS, chunksize=chunksize):
+            target._insert(conn, "feedback", FEEDBACK_COLUMNS, chunk.to_dict('records'))
+            counts['feedback'] += len(chunk)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage maintenance for the fitness tracker")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Copy data/*.csv into a SQLite database")
+    migrate_parser.add_argument("--data-dir", default="data")
+    migrate_parser.add_argument("--db", default="data/fitness.db")
+    migrate_parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        counts = migrate_csv_to_sqlite(args.data_dir, args.db, args.chunksize)
+        print(", ".join(f"{table}: {count} rows" for table, count in counts.items()))
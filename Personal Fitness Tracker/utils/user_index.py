@@ -0,0 +1,75 @@
+import csv
+import os
+import threading
+
+from utils import csv_store
+
+
+class UserIndex:
+    def __init__(self, users_file):
+        self.users_file = users_file
+        self._lock = threading.Lock()
+        self._version = None
+        self._users = {}
+
+    def _file_version(self):
+        stat = os.stat(self.users_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _reload(self, version):
+        users = {}
+        with open(self.users_file, newline='') as handle:
+            for record in csv.DictReader(handle):
+                record = {key.strip(): (value or '').strip() for key, value in record.items() if key}
+                # The first registration wins, as with the old DataFrame lookup
+                users.setdefault(record.get('email'), record)
+        self._users = users
+        self._version = version
+
+    def get(self, email, lock=True):
+        # Pass lock=False when the caller already holds the users file lock
+        with self._lock:
+            if self._file_version() == self._version:
+                return self._users.get(email)
+        # Always take the file lock before self._lock to keep a single lock order
+        if lock:
+            with csv_store.file_lock(self.users_file, exclusive=False):
+                return self._refresh_and_get(email)
+        return self._refresh_and_get(email)
+
+    def _refresh_and_get(self, email):
+        with self._lock:
+            version = self._file_version()
+            if version != self._version:
+                self._reload(version)
+            return self._users.get(email)
+
+    def add(self, row):
+        # Called under the users file lock right after appending `row`, so the
+        # index already matches everything before it in the file
+        with self._lock:
+            self._users.setdefault(row['email'], dict(row))
+            self._version = self._file_version()
+
+    def update(self, email, values):
+        # Called under the users file lock right after rewriting the row
+        with self._lock:
+            if email in self._users:
+                self._users[email] = {**self._users[email], **values}
+            self._version = self._file_version()
+
+    def __len__(self):
+        return len(self._users)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def user_index(users_file):
+    # One index per users file, shared by every AuthManager in the process
+    key = os.path.abspath(users_file)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = UserIndex(users_file)
+        return _indexes[key]
@@ -0,0 +1,193 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from utils.csv_store import fcntl
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 10_000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.25
+MAX_RETRIES = 3
+
+
+class WriteBehindQueue:
+    # Submissions are journaled (fsync'd) before they are acknowledged, then a
+    # background worker writes them to storage in batches. Writes are
+    # at-least-once: a crash between a batch write and its commit marker
+    # replays that batch on the next start. Commit markers list the exact
+    # seqs written, so a batch that keeps failing stays pending in the journal
+    # even after later batches commit.
+
+    def __init__(self, data_manager, journal_path, max_pending=MAX_PENDING,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.data_manager = data_manager
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._journal_lock = threading.Lock()
+        # Held from seq assignment to enqueue so the worker sees seqs in order;
+        # separate from the journal lock because put() can block on a full queue
+        self._submit_lock = threading.Lock()
+        self._done = threading.Condition()
+        self._submitted = 0
+        self._processed = 0
+        self._has_failures = False
+        self._closed = False
+
+        directory = os.path.dirname(journal_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._journal = open(journal_path, 'a')
+        if fcntl is not None:
+            # Each server process needs its own journal (FITNESS_JOURNAL_PATH)
+            try:
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._journal.close()
+                raise RuntimeError(f"{journal_path} is in use by another process")
+        pending, self._next_seq = self._load_journal()
+
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+        for record in pending:
+            with self._done:
+                self._submitted += 1
+            self._queue.put(record)
+        if pending:
+            logger.info("Replaying %d journaled writes from %s", len(pending), journal_path)
+
+    def _load_journal(self):
+        records = []
+        committed = set()
+        complete = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final line from a crash mid-append, never acknowledged
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'committed' in record:
+                    marker = record['committed']
+                    # Journals from before exact markers hold a high-water seq
+                    committed.update(marker if isinstance(marker, list) else range(1, marker + 1))
+                else:
+                    records.append(record)
+        if complete < os.path.getsize(self.journal_path):
+            # Cut the torn tail so the next record starts on a line of its own
+            self._journal.truncate(complete)
+        next_seq = max((record['seq'] for record in records), default=max(committed, default=0)) + 1
+        return [record for record in records if record['seq'] not in committed], next_seq
+
+    def _append_journal(self, record):
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def submit(self, kind, payload):
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        with self._submit_lock:
+            with self._journal_lock:
+                record = {'seq': self._next_seq, 'kind': kind, 'payload': payload}
+                self._next_seq += 1
+                self._append_journal(record)
+                # Counted under the journal lock so an idle truncate can't drop it
+                with self._done:
+                    self._submitted += 1
+            # Blocks when max_pending writes are already waiting (backpressure)
+            self._queue.put(record)
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        metrics = [record['payload'] for record in batch if record['kind'] == 'metrics']
+        feedback = [record['payload'] for record in batch if record['kind'] == 'feedback']
+        if metrics:
+            self.data_manager.write_metrics_batch(metrics)
+        for row in feedback:
+            self.data_manager.storage.append_feedback(row)
+
+    def _run(self):
+        while not (self._closed and self._queue.empty()):
+            batch = self._take_batch()
+            if not batch:
+                self._truncate_if_idle()
+                continue
+            for attempt in range(1, MAX_RETRIES + 1):
+                try:
+                    self._write_batch(batch)
+                    with self._journal_lock:
+                        self._append_journal({'committed': [record['seq'] for record in batch]})
+                    break
+                except Exception:
+                    logger.exception("Write-behind batch failed (attempt %d/%d)", attempt, MAX_RETRIES)
+                    time.sleep(0.1 * 2 ** attempt)
+            else:
+                self._has_failures = True
+            # A batch that still failed stays uncommitted in the journal and is replayed on restart
+            with self._done:
+                self._processed += len(batch)
+                self._done.notify_all()
+
+    def _truncate_if_idle(self):
+        with self._journal_lock, self._done:
+            idle = self._processed == self._submitted and not self._has_failures
+            if idle and self._journal.tell() > 0:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+
+    def pending(self):
+        with self._done:
+            return self._submitted - self._processed
+
+    def flush(self, timeout=None):
+        # Wait until everything submitted so far has been handled; False on
+        # timeout or when a batch failed (it stays journaled for replay)
+        with self._done:
+            target = self._submitted
+            done = self._done.wait_for(lambda: self._processed >= target, timeout)
+            return done and not self._has_failures
+
+    def close(self, timeout=None):
+        self._closed = True
+        self._worker.join(timeout)
+        with self._journal_lock:
+            self._journal.close()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(storage, journal_path=None):
+    # One queue (and worker thread) per storage backend in the process
+    from utils.data_manager import DataManager
+
+    journal_path = journal_path or os.environ.get("FITNESS_JOURNAL_PATH", "data/write_journal.jsonl")
+    key = (storage.identity(), os.path.abspath(journal_path))
+    with _queues_lock:
+        if key not in _queues:
+            write_queue = WriteBehindQueue(DataManager(storage, write_behind=False), journal_path)
+            atexit.register(write_queue.close)
+            _queues[key] = write_queue
+        return _queues[key]